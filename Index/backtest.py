@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+# Rolling / expanding re-estimation of both stages of indexregressed.py for
+# every split date at once:
+#   1) Expect ~ const + z(trends)  on the training window -> DW weights
+#      (z-scores use the training window's own mean/std, no test data)
+#   2) Expect ~ const + DW         on the same window
+#   3) predict the `horizon` months after the split -> out-of-sample R²
+# Every window statistic comes from prefix sums of [1, X, y] outer products,
+# so each window is two lookups and all windows are solved in one stacked
+# NumPy call instead of a statsmodels fit per window.
+# ── CONFIG ─────────────────────────────────────────────────────────
+HORIZON   = 12                                  # test months after each split (None = to the end)
+MIN_TRAIN = 24                                  # shortest training window, in months
+WINDOWS   = [("expanding", None), ("rolling", 60), ("rolling", 120)]
+
+
+def prefix_sums(y, X):
+    # P[t] = sum over rows < t of z z^T, z = [1, x, y] (centred on the full
+    # sample first, which changes no fit but keeps the sums well scaled)
+    X = X - X.mean(axis=0)
+    y = y - y.mean()
+    Z = np.column_stack([np.ones(len(y)), X, y])
+    P = np.zeros((len(y) + 1, Z.shape[1], Z.shape[1]))
+    np.cumsum(Z[:, :, None] * Z[:, None, :], axis=0, out=P[1:])
+    return P
+
+
+def window_fits(P, start, stop, test_stop):
+    # both stages on rows [start, stop), scored on rows [stop, test_stop);
+    # start/stop/test_stop are equal-length integer arrays, one per window
+    k = P.shape[1] - 2
+    x, yc = slice(1, k + 1), k + 1
+
+    S    = P[stop] - P[start]
+    n    = S[:, 0, 0]
+    m    = S[:, 0, x] / n[:, None]
+    ybar = S[:, 0, yc] / n
+    Cxx  = S[:, x, x] - n[:, None, None] * m[:, :, None] * m[:, None, :]
+    Cxy  = S[:, x, yc] - m * S[:, 0, yc][:, None]
+
+    # stage 1 in raw units; z-scored weights are beta * sd
+    try:
+        beta = np.linalg.solve(Cxx, Cxy[:, :, None])[:, :, 0]
+    except np.linalg.LinAlgError:         # a constant/collinear series in some window
+        beta = np.einsum("wij,wj->wi", np.linalg.pinv(Cxx), Cxy)
+    sd   = np.sqrt(np.einsum("wii->wi", Cxx) / (n - 1)[:, None])
+
+    # stage 2: DW = (x - m) . beta is centred in the window
+    q     = np.einsum("wi,wij,wj->w", beta, Cxx, beta)
+    slope = np.einsum("wi,wi->w", beta, Cxy) / q
+
+    # prediction c + x . g, squared error summed over the test window
+    g = slope[:, None] * beta
+    c = ybar - np.einsum("wi,wi->w", g, m)
+    T   = P[test_stop] - P[stop]
+    nt  = T[:, 0, 0]
+    Sy, Syy = T[:, 0, yc], T[:, yc, yc]
+    Sx, Sxy, Sxx = T[:, 0, x], T[:, x, yc], T[:, x, x]
+    sse = (Syy - 2 * c * Sy - 2 * np.einsum("wi,wi->w", g, Sxy) + nt * c**2
+           + 2 * c * np.einsum("wi,wi->w", g, Sx) + np.einsum("wi,wij,wj->w", g, Sxx, g))
+    sst = Syy - Sy**2 / nt
+
+    return {
+        "n_train": n.astype(int), "n_test": nt.astype(int),
+        "oos_r2": 1 - sse / sst,
+        "dw_slope": slope, "dw_intercept": ybar,
+        "weights": beta * sd,
+    }
+
+
+def window_bounds(total, n_series, windows=WINDOWS, horizon=HORIZON, min_train=MIN_TRAIN):
+    # (kind, length, start, stop, test_stop) per window setting, one array
+    # entry per split date, for a sample of `total` rows
+    for kind, length in windows:
+        first = max(min_train, length or 0, n_series + 2)
+        stop  = np.arange(first, total)
+        start = np.zeros_like(stop) if kind == "expanding" else stop - length
+        test_stop = np.full_like(stop, total) if horizon is None else np.minimum(stop + horizon, total)
+        # each test window needs two points for its own R²
+        ok = test_stop - stop >= 2
+        yield kind, length, start[ok], stop[ok], test_stop[ok]
+
+
+def backtest(y, X, windows=WINDOWS, horizon=HORIZON, min_train=MIN_TRAIN):
+    # y: Series (Expect), X: DataFrame of trend series on the same index.
+    # One row per (window kind, length, split date): training/test sizes,
+    # out-of-sample R² and the standardized first-stage weights.
+    yv, Xv = y.to_numpy(float), X.to_numpy(float)
+    P = prefix_sums(yv, Xv)
+
+    frames = []
+    for kind, length, start, stop, test_stop in window_bounds(len(yv), X.shape[1], windows,
+                                                              horizon, min_train):
+        fit = window_fits(P, start, stop, test_stop)
+        fit["dw_intercept"] += yv.mean()          # undo the centring in prefix_sums
+        weights = pd.DataFrame(fit.pop("weights"), columns=[f"w_{c}" for c in X.columns])
+        frames.append(pd.concat([
+            pd.DataFrame({"window": kind, "months": length or 0,
+                          "split": y.index[stop], **fit}),
+            weights,
+        ], axis=1))
+    return pd.concat(frames, ignore_index=True)
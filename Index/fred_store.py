@@ -0,0 +1,141 @@
+import os
+import json
+import argparse
+from pathlib import Path
+
+import pandas as pd
+
+# Local store of FRED series so indexregressed.py (and anything else that
+# needs EXPINF*/CPI data) only hits the network for dates it has never seen.
+# Every series is one small Parquet file under STORE_DIR, plus a
+# coverage.json listing the date ranges already asked for (disjoint, sorted),
+# so ranges FRED has no observations for aren't fetched again either. Only
+# the gaps are fetched, one call per distinct gap (series missing the same
+# range share it); dates after today can't have data yet and aren't asked
+# for. The last TRAILING_DAYS only count as covered up to the series' last
+# observation: the current month isn't published yet and is asked again.
+#
+# Offline (FRED_OFFLINE=1, or offline=True) never touches the network and
+# raises LookupError for anything not in the store. `reader` replaces the
+# FRED download, e.g. with a local stand-in in tests:
+#     reader(series_list, start, end) -> DataFrame, one column per series
+# ── CONFIG ─────────────────────────────────────────────────────────
+STORE_DIR = Path(__file__).resolve().parent / "FredData"
+OFFLINE   = os.environ.get("FRED_OFFLINE", "") not in ("", "0")
+TRAILING_DAYS = 92            # a quarter: long enough for quarterly series
+DAY = pd.Timedelta(days=1)
+
+
+def fred_reader(series, start, end):
+    from pandas_datareader.fred import FredReader
+    return FredReader(list(series), start=start, end=end).read()
+
+
+class FredStore:
+    def __init__(self, path=STORE_DIR, offline=OFFLINE, reader=fred_reader):
+        self.path    = Path(path)
+        self.offline = offline
+        self.reader  = reader
+        self.coverage_file = self.path / "coverage.json"
+        self.coverage = {}
+        if self.coverage_file.exists():
+            self.coverage = json.loads(self.coverage_file.read_text())
+
+    def _file(self, series):
+        return self.path / f"{series}.parquet"
+
+    def _load(self, series):
+        if not self._file(series).exists():
+            return pd.Series(dtype="float64", name=series)
+        return pd.read_parquet(self._file(series))[series]
+
+    def covered(self, series):
+        # [(lo, hi), ...] already requested; stores written with a single
+        # [lo, hi] span read as a list of one
+        spans = self.coverage.get(series, [])
+        if spans and isinstance(spans[0], str):
+            spans = [spans]
+        return [(pd.Timestamp(lo), pd.Timestamp(hi)) for lo, hi in spans]
+
+    def missing(self, series, start, end):
+        # date ranges of [start, end] never requested for `series`
+        gaps, at = [], start
+        for lo, hi in self.covered(series):
+            if hi < at:
+                continue
+            if lo > end:
+                break
+            if lo > at:
+                gaps.append((at, lo - DAY))
+            at = hi + DAY
+        if at <= end:
+            gaps.append((at, end))
+        return gaps
+
+    def get(self, series, start, end):
+        # DataFrame indexed by DATE, one column per series, like FredReader
+        series = [series] if isinstance(series, str) else list(series)
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+
+        today = pd.Timestamp.today().normalize()
+        gaps = {s: [g for g in self.missing(s, start, end) if g[0] <= today] for s in series}
+        todo = [s for s in series if gaps[s]]
+        if todo:
+            if self.offline:
+                raise LookupError(f"FRED series {', '.join(todo)} not in {self.path} for "
+                                  f"{start.date()}..{end.date()} and the store is offline")
+            by_gap = {}
+            for s in todo:
+                for gap in gaps[s]:
+                    by_gap.setdefault(gap, []).append(s)
+            for (lo, hi), names in by_gap.items():
+                self._add(self.reader(names, lo, hi), names, lo, hi)
+
+        out = pd.concat([self._load(s) for s in series], axis=1)
+        out.index.name = "DATE"
+        return out.loc[start:end]
+
+    def _add(self, fetched, series, start, end):
+        self.path.mkdir(parents=True, exist_ok=True)
+        # dates past today may still get observations, so they stay uncovered,
+        # and so do the trailing days after the last observation
+        end    = min(end, pd.Timestamp.today().normalize())
+        recent = pd.Timestamp.today().normalize() - pd.Timedelta(days=TRAILING_DAYS)
+        for s in series:
+            new = fetched[s].dropna() if s in fetched.columns else pd.Series(dtype="float64")
+            old = self._load(s)
+            merged = pd.concat([old[~old.index.isin(new.index)], new]).sort_index()
+            merged.index = pd.DatetimeIndex(merged.index, name="DATE")
+            merged.rename(s).to_frame().to_parquet(self._file(s))
+
+            hi = end
+            if hi > recent:
+                last = merged.index.max() if len(merged) else pd.NaT
+                hi = min(hi, max(recent, last) if pd.notna(last) else recent)
+            if start > hi:
+                continue                       # nothing settled was asked for
+            spans = []
+            for lo, up in sorted(self.covered(s) + [(start, hi)]):
+                if spans and lo <= spans[-1][1] + DAY:
+                    spans[-1][1] = max(spans[-1][1], up)
+                else:
+                    spans.append([lo, up])
+            self.coverage[s] = [[str(lo.date()), str(up.date())] for lo, up in spans]
+
+        tmp = self.coverage_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.coverage, indent=1, sort_keys=True))
+        os.replace(tmp, self.coverage_file)
+
+
+if __name__ == "__main__":
+    # fill the store on a machine with network access, e.g.
+    #   python fred_store.py EXPINF1YR EXPINF2YR EXPINF5YR CPIAUCSL --start 2004-01-01
+    ap = argparse.ArgumentParser(description="Fetch FRED series into the local store.")
+    ap.add_argument("series", nargs="+")
+    ap.add_argument("--start", default="2004-01-01")
+    ap.add_argument("--end", default=str(pd.Timestamp.today().date()))
+    ap.add_argument("--store", default=STORE_DIR)
+    args = ap.parse_args()
+    df = FredStore(args.store, offline=False).get(args.series, args.start, args.end)
+    print(df.describe().T[["count"]].assign(first=df.apply(pd.Series.first_valid_index),
+                                            last=df.apply(pd.Series.last_valid_index)))
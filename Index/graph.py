@@ -1,7 +1,8 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 from pathlib import Path
 
+from trends import load_trends
+
 # ── CONFIG ─────────────────────────────────────────────────────────
 folder = Path("./GoogleTrendsData")
 kw_files = {
@@ -14,23 +15,8 @@ kw_files = {
     "public_debt"  : "publicDebtMonthly.csv",
 }
 
-def read_monthly(label, fn):
-    df = pd.read_csv(
-        folder/ fn,
-        skiprows=1,
-        header=0,
-        parse_dates=["Month"],
-        index_col="Month"
-    )
-    df.columns = [label]
-    df[label] = df[label].replace("<1", "0.5").astype(float)
-    return df
-
 # ── 1) Read & concat ────────────────────────────────────────────────────
-monthly = pd.concat(
-    [read_monthly(label, fn) for label, fn in kw_files.items()],
-    axis=1
-).ffill()
+monthly = load_trends(kw_files, folder)
 
 # ── 2) Compute calendar-year means ──────────────────────────────────────
 yearly = monthly.resample("Y").mean()
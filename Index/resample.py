@@ -0,0 +1,169 @@
+import os
+from multiprocessing import Pool
+
+import numpy as np
+
+# Block bootstrap and block permutation tests for the two-stage Debt-Worry
+# model of indexregressed.py:
+#   stage 1: Expect ~ const + z(trends) on every row      -> weights, DW
+#   stage 2: Expect ~ const + DW        on the train rows -> coefficient
+# Monthly series are autocorrelated and DW is itself estimated, so every
+# replicate re-runs *both* stages on resampled data instead of trusting
+# model.conf_int() / model.pvalues.
+#
+# A replicate only needs sums of [1, x, y] outer products over its rows, so
+# replicates are done in stacked NumPy batches: bootstrap rows become a
+# (replicates x months) count matrix times the per-month outer products, and
+# permutations only change the sums that involve y. Batches of CHUNK
+# replicates each get their own child of SeedSequence(seed) and are spread
+# over a process pool; results depend on the seed, never on the worker count.
+# ── CONFIG ─────────────────────────────────────────────────────────
+N_REPLICATES = 5000
+BLOCK_MONTHS = 12          # block length for both resampling schemes
+CHUNK        = 500         # replicates per task / per seed
+WORKERS      = os.cpu_count() or 1
+SEED         = 20240101
+
+
+def two_stage(S1, S2):
+    # stage-2 (intercept, DW slope, slope t-stat) for stacks of [1, x, y] sums: S1 over the
+    # stage-1 rows, S2 over the stage-2 rows, both shaped (R, k+2, k+2)
+    k = S1.shape[1] - 2
+    x, yc = slice(1, k + 1), k + 1
+
+    n = S1[:, 0, 0]
+    m = S1[:, 0, x] / n[:, None]
+    Cxx = S1[:, x, x] - n[:, None, None] * m[:, :, None] * m[:, None, :]
+    Cxy = S1[:, x, yc] - m * S1[:, 0, yc][:, None]
+    try:
+        beta = np.linalg.solve(Cxx, Cxy[:, :, None])[:, :, 0]
+    except np.linalg.LinAlgError:
+        beta = np.einsum("rij,rj->ri", np.linalg.pinv(Cxx), Cxy)
+
+    # DW = (x - m) . beta, summed over the stage-2 rows; regressing on DW or
+    # on z-scored DW only rescales beta, which the slope absorbs
+    n2   = S2[:, 0, 0]
+    Sd   = np.einsum("ri,ri->r", S2[:, 0, x] - n2[:, None] * m, beta)
+    Cm   = (S2[:, x, x] - m[:, :, None] * S2[:, 0, None, x] - S2[:, x, 0, None] * m[:, None, :]
+            + n2[:, None, None] * m[:, :, None] * m[:, None, :])
+    Sdd  = np.einsum("ri,rij,rj->r", beta, Cm, beta)
+    Sdy  = np.einsum("ri,ri->r", beta, S2[:, x, yc] - m * S2[:, 0, yc][:, None])
+    Sy   = S2[:, 0, yc]
+
+    # centred stage-2 sums -> slope and its OLS t-statistic
+    Sdd_c = Sdd - Sd**2 / n2
+    Sdy_c = Sdy - Sd * Sy / n2
+    Syy_c = S2[:, yc, yc] - Sy**2 / n2
+    slope = Sdy_c / Sdd_c
+    sse   = Syy_c - slope * Sdy_c
+    tstat = slope / np.sqrt(sse / (n2 - 2) / Sdd_c)
+    return (Sy - slope * Sd) / n2, slope, tstat
+
+
+def outer_rows(y, X):
+    # per-month [1, x, y] outer products, flattened: (months, (k+2)^2)
+    Z = np.column_stack([np.ones(len(y)), X, y])
+    return (Z[:, :, None] * Z[:, None, :]).reshape(len(y), -1)
+
+
+# ── 1) RESAMPLING SCHEMES ────────────────────────────────────────────
+def block_counts(rng, months, reps, block):
+    # moving-block bootstrap: how often each month is drawn, (reps, months)
+    nblocks = -(-months // block)
+    starts  = rng.integers(0, months - block + 1, size=(reps, nblocks))
+    rows    = (starts[:, :, None] + np.arange(block)).reshape(reps, -1)[:, :months]
+    flat    = (rows + months * np.arange(reps)[:, None]).ravel()
+    return np.bincount(flat, minlength=reps * months).reshape(reps, months)
+
+
+def block_permutation(rng, months, reps, block):
+    # row orders that shuffle whole blocks of consecutive months, (reps, months)
+    padded = np.full((-(-months // block), block), -1)
+    padded.ravel()[:months] = np.arange(months)
+    order  = np.argsort(rng.random((reps, len(padded))), axis=1)
+    rows   = padded[order].reshape(reps, -1)
+    return rows[rows >= 0].reshape(reps, months)
+
+
+# ── 2) ONE BATCH OF REPLICATES ───────────────────────────────────────
+_data = {}
+
+
+def set_data(y, X, train, block):
+    # pool initializer: each worker gets the data once
+    _data.update(y=y, X=X, train=train, block=block, outer=outer_rows(y, X))
+
+
+def bootstrap_batch(task):
+    seed, reps = task
+    rng = np.random.default_rng(seed)
+    y, train, outer = _data["y"], _data["train"], _data["outer"]
+    size = int(np.sqrt(outer.shape[1]))
+    counts = block_counts(rng, len(y), reps, _data["block"])
+    S1 = (counts @ outer).reshape(reps, size, size)
+    S2 = ((counts * train) @ outer).reshape(reps, size, size)
+    return np.column_stack(two_stage(S1, S2)[:2])
+
+
+def permutation_batch(task):
+    # Expect shuffled in blocks against fixed trends: both stages re-fit
+    seed, reps = task
+    rng = np.random.default_rng(seed)
+    y, X, train, outer = _data["y"], _data["X"], _data["train"], _data["outer"]
+    k = X.shape[1]
+    yp = y[block_permutation(rng, len(y), reps, _data["block"])]
+
+    def sums(mask):
+        base = outer[mask].sum(axis=0).reshape(k + 2, k + 2)
+        S = np.broadcast_to(base, (reps, k + 2, k + 2)).copy()
+        ym = yp[:, mask]
+        S[:, 0, -1] = S[:, -1, 0] = ym.sum(axis=1)
+        S[:, 1:-1, -1] = S[:, -1, 1:-1] = ym @ X[mask]
+        S[:, -1, -1] = (ym**2).sum(axis=1)
+        return S
+
+    return two_stage(sums(np.ones(len(y), bool)), sums(train))[2]
+
+
+def run_batches(func, y, X, train, reps, block, seed, workers):
+    seeds = np.random.SeedSequence(seed).spawn(-(-reps // CHUNK))
+    tasks = [(s, min(CHUNK, reps - i * CHUNK)) for i, s in enumerate(seeds)]
+    args  = (y, X, train, block)
+    if workers <= 1:
+        set_data(*args)
+        parts = [func(t) for t in tasks]
+    else:
+        with Pool(workers, initializer=set_data, initargs=args) as pool:
+            parts = pool.map(func, tasks)
+    return np.concatenate(parts)
+
+
+# ── 3) WHAT indexregressed.py PLOTS ──────────────────────────────────
+def resampled_inference(y, X, train, reps=N_REPLICATES, block=BLOCK_MONTHS,
+                        seed=SEED, workers=WORKERS, level=0.95):
+    # y: Expect, X: raw trend series (months x k), train: bool mask of the
+    # stage-2 rows. Returns the point estimate, bootstrap percentile CI and
+    # standard error of (const, DW), and the two-sided block-permutation
+    # p-value of the DW slope.
+    y, X, train = np.asarray(y, float), np.asarray(X, float), np.asarray(train, bool)
+    outer = outer_rows(y, X)
+    size  = X.shape[1] + 2
+    const, slope, tstat = (v[0] for v in two_stage(outer.sum(axis=0).reshape(1, size, size),
+                                                    outer[train].sum(axis=0).reshape(1, size, size)))
+    point = np.array([const, slope])
+
+    boot = run_batches(bootstrap_batch, y, X, train, reps, block, seed, workers)
+    null = run_batches(permutation_batch, y, X, train, reps, block, seed + 1, workers)
+    alpha = (1 - level) / 2
+    lo, hi = np.nanquantile(boot, [alpha, 1 - alpha], axis=0)
+    # the slope itself stays near 1 under the null (stage 1 fits DW to
+    # Expect on those same rows), so the test is on its t-statistic; only
+    # the slope has a "no relation" null at all
+    exceed = (np.abs(null) >= np.abs(tstat)).sum()
+    return {
+        "names":  ["const", "DW"],
+        "coef":   point,
+        "ci_lo":  lo, "ci_hi": hi,
+        "se":     np.nanstd(boot, axis=0, ddof=1),
+        "pvalue": np.array([np.nan, (1 + exceed) / (1 + len(null))]),
+    }
@@ -0,0 +1,105 @@
+import os
+import argparse
+from itertools import combinations
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+from backtest import prefix_sums, window_bounds, window_fits, WINDOWS, HORIZON, MIN_TRAIN
+
+# Which Google Trends series should go into DW, and at what lag? Every
+# non-empty subset of the kw_files series (127 for seven) is backtested at
+# every lag in LAGS, on the same rolling/expanding splits as --backtest, and
+# ranked by out-of-sample R². Lag L means Expect in month t is explained by
+# the trends of month t-L (L > 0: searches lead expectations).
+#
+# All lags use the same months of Expect so their scores are comparable.
+# Per lag the prefix sums of [1, all series, Expect] are built once; a
+# subset's sums are just a slice of them. Lags are spread over a process pool.
+# ── CONFIG ─────────────────────────────────────────────────────────
+LAGS       = range(-12, 13)
+WORKERS    = os.cpu_count() or 1
+SEARCH_CSV = "search_results.csv"
+RANK_BY    = "median_oos_r2"    # robust to the odd split with a huge negative R²
+
+
+def all_subsets(n):
+    return [s for k in range(1, n + 1) for s in combinations(range(n), k)]
+
+
+# ── 1) ONE LAG, EVERY SUBSET ─────────────────────────────────────────
+_panel = {}
+
+
+def set_panel(y, X, columns, lags, windows, horizon, min_train):
+    # pool initializer: each worker gets the data once, not once per task
+    _panel.update(y=y, X=X, columns=columns, lags=list(lags),
+                  windows=windows, horizon=horizon, min_train=min_train)
+
+
+def evaluate_lag(lag):
+    y, X = _panel["y"], _panel["X"]
+    lags = _panel["lags"]
+    # months t with t-L inside the sample for every lag L
+    lo, hi = max(0, max(lags)), len(y) + min(0, min(lags))
+    P = prefix_sums(y[lo:hi], X[lo - lag:hi - lag])
+    k = X.shape[1]
+    bounds = list(window_bounds(hi - lo, k, _panel["windows"],
+                                _panel["horizon"], _panel["min_train"]))
+    # every window setting solved in one call per subset, split up afterwards
+    start, stop, test_stop = (np.concatenate([b[i] for b in bounds]) for i in (2, 3, 4))
+    cuts = np.cumsum([len(b[3]) for b in bounds])[:-1]
+
+    rows = []
+    for subset in all_subsets(k):
+        idx = [0, *(j + 1 for j in subset), k + 1]
+        P_sub = P[:, idx][:, :, idx]
+        name  = "+".join(str(_panel["columns"][j]) for j in subset)
+        fits  = np.split(window_fits(P_sub, start, stop, test_stop)["oos_r2"], cuts)
+        for (kind, length, *_), r2 in zip(bounds, fits):
+            rows.append({
+                "subset": name, "n_series": len(subset), "lag": lag,
+                "window": kind, "months": length or 0, "splits": len(r2),
+                "mean_oos_r2": r2.mean(), "median_oos_r2": np.median(r2),
+                "share_positive": (r2 > 0).mean(),
+            })
+    return rows
+
+
+# ── 2) ALL LAGS, RANKED ──────────────────────────────────────────────
+def search(y, X, lags=LAGS, windows=WINDOWS, horizon=HORIZON, min_train=MIN_TRAIN,
+           workers=WORKERS, rank_by=RANK_BY):
+    # y: Series (Expect), X: DataFrame of trend series on the same index.
+    # One row per (subset, lag, window setting), best first.
+    args = (y.to_numpy(float), X.to_numpy(float), list(X.columns),
+            lags, windows, horizon, min_train)
+    if workers <= 1:
+        set_panel(*args)
+        parts = [evaluate_lag(lag) for lag in lags]
+    else:
+        with Pool(workers, initializer=set_panel, initargs=args) as pool:
+            parts = pool.map(evaluate_lag, lags)
+
+    table = pd.DataFrame([row for part in parts for row in part])
+    table = table.sort_values(rank_by, ascending=False, ignore_index=True)
+    table.insert(0, "rank", np.arange(1, len(table) + 1))
+    return table
+
+
+if __name__ == "__main__":
+    from indexregressed import load_data
+
+    ap = argparse.ArgumentParser(description="Rank keyword subsets x lags for the Debt-Worry index.")
+    ap.add_argument("--min-lag", type=int, default=min(LAGS))
+    ap.add_argument("--max-lag", type=int, default=max(LAGS))
+    ap.add_argument("--workers", type=int, default=WORKERS)
+    ap.add_argument("--out", default=SEARCH_CSV)
+    args = ap.parse_args()
+
+    data  = load_data()
+    table = search(data["Expect"], data.drop(columns="Expect"),
+                   lags=range(args.min_lag, args.max_lag + 1), workers=args.workers)
+    table.to_csv(args.out, index=False)
+    print(table.head(20).to_string(index=False))
+    print(f"{len(table):,} candidates written to '{args.out}'")
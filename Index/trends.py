@@ -0,0 +1,109 @@
+import os
+import hashlib
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+# One loader for the Google Trends exports in GoogleTrendsData, shared by
+# graph.py, indexregressed.py and the backtest/search workers.
+#  - files are matched case-insensitively ("debtMonthly.csv" finds
+#    debtmonthly.csv), so the kw_files names work on Linux as well
+#  - the "Category: ..." preamble is skipped and "<1" read as 0.5, in one place
+#  - the aligned, forward-filled monthly panel is cached as Parquet under a
+#    fingerprint of the files (name, size, mtime) and the label mapping, so
+#    repeat loads skip the CSV parsing entirely and any edit re-parses.
+#    One panel is kept per selection of files (graph.py and
+#    indexregressed.py read different ones): writing a new one deletes the
+#    selection's older panels
+# ── CONFIG ─────────────────────────────────────────────────────────
+TRENDS_DIR  = Path(__file__).resolve().parent / "GoogleTrendsData"
+CACHE_DIR   = Path(__file__).resolve().parent / ".trends_cache"
+LESS_THAN_1 = 0.5             # value used for Google's "<1"
+VERSION     = 1               # bump when parsing changes, invalidates caches
+
+
+def find_files(folder=TRENDS_DIR):
+    # {lower-cased file name: path} for every CSV in `folder`
+    return {p.name.lower(): p for p in Path(folder).iterdir() if p.suffix.lower() == ".csv"}
+
+
+def resolve(fn, files):
+    try:
+        return files[fn.lower()]
+    except KeyError:
+        raise FileNotFoundError(f"no Google Trends file matching '{fn}' "
+                                f"(have: {', '.join(sorted(p.name for p in files.values()))})")
+
+
+def default_label(path):
+    # "debtToGdpMonthly.csv" -> "debtToGdp"
+    stem = path.stem
+    return stem[:-len("monthly")] if stem.lower().endswith("monthly") else stem
+
+
+def read_monthly(label, path):
+    # one export: a "Category:" line, a blank line, then "Month,<term>: (...)"
+    with open(path, encoding="utf-8-sig") as f:
+        skip = 0
+        for line in f:
+            if line.startswith("Month,"):
+                break
+            skip += 1
+    df = pd.read_csv(path, skiprows=skip, header=0, encoding="utf-8-sig",
+                     parse_dates=["Month"], index_col="Month")
+    df.columns = [label]
+    values = df[label].astype(str).str.strip().replace("<1", str(LESS_THAN_1))
+    df[label] = pd.to_numeric(values, errors="coerce")
+    return df
+
+
+def selection(paths):
+    # which files under which labels, whatever their contents
+    key = "|".join(f"{label}={path}" for label, path in paths.items())
+    return hashlib.blake2b(key.encode(), digest_size=6).hexdigest()
+
+
+def fingerprint(paths):
+    h = hashlib.blake2b(f"v{VERSION}|{LESS_THAN_1}".encode(), digest_size=12)
+    for label, path in paths.items():
+        st = os.stat(path)
+        h.update(f"|{label}={path.name}:{st.st_size}:{st.st_mtime_ns}".encode())
+    return h.hexdigest()
+
+
+def load_trends(kw_files=None, folder=TRENDS_DIR, cache=True):
+    # monthly panel, one column per label, forward-filled.
+    # kw_files: {label: file name}; None = every CSV in `folder`.
+    files = find_files(folder)
+    if kw_files is None:
+        paths = {default_label(p): p for _, p in sorted(files.items())}
+    else:
+        paths = {label: resolve(fn, files) for label, fn in kw_files.items()}
+
+    prefix = f"panel-{selection(paths)}-"
+    cached = CACHE_DIR / f"{prefix}{fingerprint(paths)}.parquet"
+    if cache and cached.exists():
+        try:
+            return pd.read_parquet(cached)
+        except FileNotFoundError:
+            pass                               # replaced by a concurrent load
+
+    monthly = pd.concat(
+        [read_monthly(label, path) for label, path in paths.items()],
+        axis=1
+    ).ffill()
+
+    if cache:
+        CACHE_DIR.mkdir(exist_ok=True)
+        # a temp file of its own: concurrent cold loads (pipeline stages run
+        # in parallel) may write the same panel at once
+        with tempfile.NamedTemporaryFile(dir=CACHE_DIR, prefix=cached.name, suffix=".tmp",
+                                         delete=False) as tmp:
+            monthly.to_parquet(tmp)
+        os.replace(tmp.name, cached)
+        # older panels of this selection
+        for old in CACHE_DIR.glob(f"{prefix}*.parquet"):
+            if old != cached:
+                old.unlink(missing_ok=True)
+    return monthly
@@ -1,57 +1,205 @@
+import os
+import csv
+import json
+import argparse
+
+import numpy as np
 import pandas as pd
-from transformers import pipeline
 from tqdm.auto import tqdm
-import csv
+
+from corpus import iter_corpus, ParquetParts
+from sentiment_model import make_scorer, labels_from
+from score_cache import ScoreCache, CachedScorer
+from monthly_cube import MonthlyCube
 # ── CONFIG ───────────────────────────────────────────────────────────────
-INPUT_CSV  = "economics_debt_deficit_posts.csv"        # your submissions/comments CSV
-OUTPUT_CSV = "submission_economics_sentiment.csv" # where to save model outputs
+INPUT_CSV  = "RawRedditCount/Economics_debt_deficit_posts.csv"     # your submissions/comments CSV (or .parquet)
+OUTPUT_CSV = "SentimentData/submission_economics_sentiment.csv"    # where to save model outputs (or .parquet)
+
+DEVICE     = "cpu"   # "cuda" to run on a GPU
+BATCH_SIZE = 32      # texts per forward pass (batches are grouped by token length)
+MAX_TOKENS = 512     # truncate each text to this many tokens
+
+# the input is read, scored and appended to the output CHUNK_ROWS rows at a
+# time, so memory stays flat however big it is; after every chunk the
+# progress goes to <output>.ckpt.json and --resume carries on from there
+CHUNK_ROWS = 20_000
+
+# "onnx" = int8 ONNX Runtime graph from ONNX_DIR (make it once with
+# `python sentiment_model.py --export`, check it with `--check`)
+BACKEND          = "torch"
+ONNX_DIR         = "twitter-roberta-onnx"
+INTRA_OP_THREADS = 0     # 0 = let ONNX Runtime decide
+INTER_OP_THREADS = 0
+
+# scores already computed on earlier runs are reused (None = no cache)
+CACHE_PATH        = "sentiment_cache.sqlite"
+CACHE_MAX_ENTRIES = 2_000_000
 
-# ── 1) LOAD ────────────────────────────────────────────────────────────────
-df = pd.read_csv(INPUT_CSV)
+# texts that say nothing about sentiment
+DROP_TEXTS = ["[deleted]", "[removed]"]
 
-# ── 2) BUILD THE “analyze_text” COLUMN ────────────────────────────────────
+
+# ── 1) BUILD THE “analyze_text” COLUMN ────────────────────────────────────
 #   - if type=="submission", take only the title
 #   - otherwise (comments), take the text field
-if "type" not in df.columns:
-    raise ValueError("CSV must have a 'type' column with values 'submission' or 'comment'")
-if "title" not in df.columns and "text" not in df.columns:
-    raise ValueError("CSV must have both 'title' and 'text' columns")
-
-df["analyze_text"] = df.apply(
-    lambda row: row["title"]
-                if row["type"].strip().lower() == "submission"
-                else row["text"],
-    axis=1
-).fillna("")
-
-# drop rows where there's nothing to analyze (e.g. “[deleted]” comments)
-df = df[df["analyze_text"].str.strip().str.lower() != "[deleted]"].copy()
-
-# ── 3) TWITTER RoBERTa SENTIMENT ─────────────────────────────────────────
-twitter_roberta = pipeline(
-    "sentiment-analysis",
-    model="cardiffnlp/twitter-roberta-base-sentiment",
-    tokenizer="cardiffnlp/twitter-roberta-base-sentiment",
-    top_k=None,   # return all scores so we can pick the best
-    device=0      # set to -1 for CPU-only
-)
-
-def twitter_label(text: str) -> str:
-    scores = twitter_roberta(text[:512])[0]
-    # labels: 'LABEL_0' = negative, 'LABEL_1' = neutral, 'LABEL_2' = positive
-    best = max(scores, key=lambda d: d["score"])["label"]
-    return {"LABEL_0": "neg", "LABEL_1": "neu", "LABEL_2": "pos"}[best]
-
-# apply with progress bar
-df["twitter_label"] = [
-    twitter_label(t) for t in tqdm(df["analyze_text"], desc="Twitter-RoBERTa")
-]
-
-# ── 4) SAVE OUTPUTS ───────────────────────────────────────────────────────
-df.to_csv(
-    OUTPUT_CSV,
-    index=False,
-    quoting=csv.QUOTE_ALL,    # wrap every field in quotes
-    quotechar='"'
-)
-print(f"Saved Twitter-RoBERTa sentiment for {len(df)} items to '{OUTPUT_CSV}'")
+def add_analyze_text(df):
+    if "type" not in df.columns:
+        raise ValueError("CSV must have a 'type' column with values 'submission' or 'comment'")
+    if "title" not in df.columns and "text" not in df.columns:
+        raise ValueError("CSV must have both 'title' and 'text' columns")
+
+    missing = pd.Series(np.nan, index=df.index, dtype=object)
+    title = df["title"] if "title" in df.columns else missing
+    text  = df["text"] if "text" in df.columns else missing
+    is_submission = df["type"].astype(str).str.strip().str.lower().eq("submission")
+    df["analyze_text"] = title.astype(object).where(is_submission, text.astype(object)).fillna("")
+
+    # drop rows where there's nothing to analyze (“[deleted]”/“[removed]”)
+    keep = ~df["analyze_text"].astype(str).str.strip().str.lower().isin(DROP_TEXTS)
+    return df[keep].copy()
+
+
+# ── 2) CHECKPOINT: HOW FAR INPUT AND OUTPUT GOT ──────────────────────────
+def load_checkpoint(ckpt_path, input_path):
+    with open(ckpt_path, encoding="utf-8") as f:
+        state = json.load(f)
+    if state["input"] != str(input_path) or state["input_size"] != os.path.getsize(input_path):
+        raise SystemExit(f"{ckpt_path} is for a different input ({state['input']}); "
+                         f"run without --resume to start over")
+    return state
+
+
+def save_checkpoint(ckpt_path, state):
+    tmp = ckpt_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp, ckpt_path)
+
+
+def open_output(output_path, columns, position):
+    # Parquet dataset (one part per chunk) or CSV cut back to `position`
+    if str(output_path).endswith(".parquet"):
+        return ParquetParts(output_path, columns, keep=position)
+    if position == 0:
+        return open(output_path, "w", newline="", encoding="utf-8")
+    with open(output_path, "r+b") as f:
+        f.truncate(position)
+    return open(output_path, "a", newline="", encoding="utf-8")
+
+
+# ── 3) ONE SCORE PER DUPLICATE GROUP ─────────────────────────────────────
+# input from dedup.py has a dup_group column: only the first row of each
+# group reaches the model and the rest of the group gets its label. A
+# group's first row comes first in the file, so `known` (dup_group ->
+# label, filled as groups are scored) already has it for later chunks.
+def score_labels(df, scorer, known=None):
+    if known is None or "dup_group" not in df.columns:
+        return labels_from(scorer.probabilities(df["analyze_text"].astype(str), progress=False))
+    groups = df["dup_group"].astype(str)
+    todo = ~groups.isin(known.keys()) & ~groups.duplicated()
+    if todo.any():
+        probs = scorer.probabilities(df.loc[todo, "analyze_text"].astype(str), progress=False)
+        known.update(zip(groups[todo], labels_from(probs)))
+    return groups.map(known).to_numpy()
+
+
+def known_labels(output_path):
+    # dup_group -> label of everything already in the output (on --resume)
+    known = {}
+    for df in iter_corpus(output_path, 100_000, columns=["dup_group", "twitter_label"], dtype=str):
+        known.update(zip(df["dup_group"].astype(str), df["twitter_label"]))
+    return known
+
+
+# ── 4) STREAM: LOAD → TEXT → TWITTER RoBERTa → APPEND ───────────────────
+def run(input_path=INPUT_CSV, output_path=OUTPUT_CSV, chunk_rows=CHUNK_ROWS,
+        resume=False, backend=BACKEND):
+    # batched: texts are sorted into token-length buckets, padded per batch
+    # and the labels mapped back to the original row order
+    onnx_opts = {}
+    if backend == "onnx":
+        onnx_opts = dict(onnx_dir=ONNX_DIR,
+                         intra_op_threads=INTRA_OP_THREADS,
+                         inter_op_threads=INTER_OP_THREADS)
+    twitter_roberta = make_scorer(
+        backend,
+        "cardiffnlp/twitter-roberta-base-sentiment",
+        device=DEVICE,
+        batch_size=BATCH_SIZE,
+        max_tokens=MAX_TOKENS,
+        **onnx_opts,
+    )
+    # only texts not seen on this or an earlier run go through the model
+    cache = None
+    if CACHE_PATH:
+        cache = ScoreCache(CACHE_PATH, CACHE_MAX_ENTRIES)
+        twitter_roberta = CachedScorer(twitter_roberta, cache)
+
+    ckpt_path = f"{output_path}.ckpt.json"
+    state = {"input": str(input_path), "input_size": os.path.getsize(input_path),
+             "rows_read": 0, "rows_written": 0, "output": 0}
+    if resume and os.path.exists(ckpt_path):
+        state = load_checkpoint(ckpt_path, input_path)
+        print(f"Resuming after {state['rows_read']:,} input rows "
+              f"({state['rows_written']:,} labeled)")
+
+    # every column is kept as the text it was stored as (CSV), so chunks
+    # can't end up with different inferred dtypes
+    chunks = iter_corpus(input_path, chunk_rows, skip=state["rows_read"], dtype=str)
+    # monthly label counts for the plots, committed with every checkpoint
+    cube = MonthlyCube(output_path)
+    outf = None
+    known = None
+    try:
+        with tqdm(desc="rows", unit="rows", initial=state["rows_read"]) as bar:
+            for chunk in chunks:
+                n_read = len(chunk)
+                df = add_analyze_text(chunk)
+                if outf is None:
+                    outf = open_output(output_path, list(df.columns) + ["twitter_label"], state["output"])
+                    cube.sync(state["output"])
+                    if "dup_group" in df.columns:
+                        known = known_labels(output_path) if state["output"] else {}
+                df["twitter_label"] = score_labels(df, twitter_roberta, known)
+
+                if isinstance(outf, ParquetParts):
+                    outf.write_frame(df)
+                else:
+                    df.to_csv(
+                        outf,
+                        header=outf.tell() == 0,
+                        index=False,
+                        quoting=csv.QUOTE_ALL,    # wrap every field in quotes
+                        quotechar='"'
+                    )
+                outf.flush()
+
+                state["rows_read"]    += n_read
+                state["rows_written"] += len(df)
+                state["output"]        = outf.tell()
+                cube.add_frame(df)
+                cube.commit(state["output"])
+                save_checkpoint(ckpt_path, state)
+                bar.update(n_read)
+    finally:
+        if outf is not None:
+            outf.close()
+        cube.close()
+        if cache is not None:
+            print(cache.stats())
+            cache.close()
+
+    print(f"Saved Twitter-RoBERTa sentiment for {state['rows_written']} items to '{output_path}'")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Label Reddit posts/comments with Twitter-RoBERTa sentiment.")
+    ap.add_argument("--input", default=INPUT_CSV)
+    ap.add_argument("--output", default=OUTPUT_CSV)
+    ap.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS,
+                    help="rows read, scored and written at a time")
+    ap.add_argument("--resume", action="store_true",
+                    help="carry on from <output>.ckpt.json instead of starting over")
+    ap.add_argument("--backend", choices=["torch", "onnx"], default=BACKEND)
+    args = ap.parse_args()
+    run(args.input, args.output, args.chunk_rows, args.resume, args.backend)
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import platform
+import statistics
+import subprocess
+from pathlib import Path
+
+import synth_dump
+
+
+# Throughput of the scan and sentiment stages on synthetic dumps (see
+# synth_dump.py), so they can be tuned and compared between versions
+# without the real dumps. Cases:
+#   scrape            scrape.stream_and_filter over the mixed dump
+#   scrape2_ids       scrape2 pass 1, submissions -> matching ids
+#   scrape2_comments  scrape2 pass 2, comments joined against those ids
+#   sentiment         the sentiment model on CPU over comment bodies
+# Every run is a fresh child process, so peak RSS (from wait4, which
+# covers its worker pools) belongs to that case alone; each case is run
+# REPEAT times and the median kept. One JSON record per benchmark run is
+# appended to RESULTS, with the git revision, machine and data settings;
+# --compare checks the last run against the previous one on the same data.
+# ── CONFIG ───────────────────────────────────────────────────────────────
+DATA_DIR   = Path(__file__).resolve().parent / ".bench_data"   # generated dumps, reused
+RESULTS    = Path(__file__).resolve().parent / "benchmark_results.jsonl"   # untracked
+SIZE_MB    = 64
+WORKERS    = sorted({1, os.cpu_count() or 1})
+REPEAT     = 3
+SENT_TEXTS = 512              # comment bodies scored by the sentiment case
+BACKENDS   = ["torch"]        # add "onnx" once `sentiment_model.py --export` was run
+MODEL      = None             # None = sentiment_model.MODEL_NAME (torch backend)
+TOLERANCE  = 0.10             # --compare flags cases this much slower
+
+
+# ── 1) DATA ──────────────────────────────────────────────────────────────
+def dataset(size_mb=SIZE_MB, seed=synth_dump.SEED, **knobs):
+    # generated once per setting, under DATA_DIR/<fingerprint>/
+    settings = {"size_mb": size_mb, "seed": seed, **knobs}
+    key  = hashlib.blake2b(json.dumps(settings, sort_keys=True).encode(), digest_size=6).hexdigest()
+    path = DATA_DIR / key
+    meta = path / "info.json"
+    if not meta.exists():
+        print(f"generating {size_mb} MB synthetic dumps in {path} ...", flush=True)
+        info = synth_dump.make_dumps(str(path), size_mb, seed, **knobs)
+        meta.write_text(json.dumps({"settings": settings, "key": key, "dumps": info}, indent=1))
+    return json.loads(meta.read_text())
+
+
+# ── 2) ONE CASE (child process) ──────────────────────────────────────────
+def run_case(case, param, data, work, model=MODEL):
+    # returns what was processed; the parent times nothing itself
+    dumps = data["dumps"]
+    if case == "scrape":
+        from scrape import stream_and_filter
+        t0 = time.perf_counter()
+        stream_and_filter(dumps["mixed"]["path"], str(work / "posts.csv"), workers=param)
+        return {"seconds": time.perf_counter() - t0, **sized(dumps["mixed"])}
+
+    if case in ("scrape2_ids", "scrape2_comments"):
+        from idset import IdSet
+        from scrape2 import extract_submission_ids, filter_comments
+        keep_ids = IdSet()
+        t0 = time.perf_counter()
+        extract_submission_ids(dumps["submissions"]["path"], str(work / "ids.txt"), keep_ids, param)
+        if case == "scrape2_ids":
+            return {"seconds": time.perf_counter() - t0, **sized(dumps["submissions"])}
+        t0 = time.perf_counter()
+        filter_comments(dumps["comments"]["path"], keep_ids, str(work / "comments.csv"), param)
+        return {"seconds": time.perf_counter() - t0, **sized(dumps["comments"])}
+
+    if case == "sentiment":
+        from dumpscan import iter_chunks, split_lines
+        from sentiment_model import make_scorer
+        texts = []
+        for chunk, _ in iter_chunks(dumps["comments"]["path"]):
+            for line in split_lines(chunk):
+                try:
+                    texts.append(json.loads(line)["body"])
+                except (ValueError, KeyError):
+                    continue
+            if len(texts) >= SENT_TEXTS:
+                break
+        texts = texts[:SENT_TEXTS]
+        scorer = make_scorer(param, **({"model_name": model} if model else {}), device="cpu")
+        scorer.probabilities(texts[:scorer.batch_size], progress=False)   # warm-up
+        t0 = time.perf_counter()
+        scorer.probabilities(texts, progress=False)
+        return {"seconds": time.perf_counter() - t0, "lines": len(texts),
+                "bytes": sum(len(t.encode()) for t in texts)}
+    raise ValueError(f"unknown case {case!r}")
+
+
+def sized(dump):
+    return {"lines": dump["lines"], "bytes": dump["bytes"]}
+
+
+def measure(case, param, data, model=MODEL):
+    # one run in a fresh process -> its numbers plus peak RSS
+    work = Path(DATA_DIR / data["key"] / "work")
+    shutil.rmtree(work, ignore_errors=True)
+    work.mkdir()
+    result = work / "result.json"
+    env = {**os.environ, "MONTHLY_CUBE": str(work / "cube.sqlite")}
+    proc = subprocess.Popen(
+        [sys.executable, __file__, "--child", case, str(param), str(DATA_DIR / data["key"]), model or ""],
+        cwd=Path(__file__).resolve().parent, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    stderr = proc.stderr.read()
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode != 0:
+        raise RuntimeError(stderr.decode(errors="replace").strip().splitlines()[-1])
+    out = json.loads(result.read_text())
+    out["peak_rss_mb"] = round(usage.ru_maxrss / 1024, 1)
+    return out
+
+
+# ── 3) ALL CASES → ONE RECORD ────────────────────────────────────────────
+def git_revision():
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                             text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                               capture_output=True, text=True).stdout.strip()
+        return rev + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark(cases, data, workers=WORKERS, backends=BACKENDS, repeat=REPEAT, model=MODEL):
+    results = []
+    for case in cases:
+        for param in (backends if case == "sentiment" else workers):
+            label = f"{case}[{param}]"
+            try:
+                runs = [measure(case, param, data, model) for _ in range(repeat)]
+            except RuntimeError as e:
+                print(f"  {label:<28} FAILED: {e}", flush=True)
+                results.append({"case": case, "param": param, "error": str(e)})
+                continue
+            seconds = statistics.median(r["seconds"] for r in runs)
+            row = {
+                "case": case, "param": param, "seconds": round(seconds, 4),
+                "runs": [round(r["seconds"], 4) for r in runs],
+                "lines": runs[0]["lines"], "bytes": runs[0]["bytes"],
+                "mb_s": round(runs[0]["bytes"] / 2**20 / seconds, 2),
+                "lines_s": round(runs[0]["lines"] / seconds, 1),
+                "peak_rss_mb": max(r["peak_rss_mb"] for r in runs),
+            }
+            results.append(row)
+            print(f"  {label:<28} {row['mb_s']:8.2f} MB/s {row['lines_s']:12,.0f} lines/s "
+                  f"{row['peak_rss_mb']:8.0f} MB peak", flush=True)
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "machine": {"platform": platform.platform(), "cpus": os.cpu_count()},
+        "data": data["settings"],
+        "model": model,
+        "results": results,
+    }
+
+
+def compare(records, tolerance=TOLERANCE):
+    # last record vs the previous one on the same data: throughput ratios
+    last = records[-1]
+    prev = next((r for r in reversed(records[:-1]) if r["data"] == last["data"]), None)
+    if prev is None:
+        print("nothing earlier on the same data to compare with")
+        return []
+    before = {(r["case"], r["param"]): r for r in prev["results"] if "error" not in r}
+    slower = []
+    print(f"vs {prev['git']} ({prev['timestamp']}):")
+    for r in last["results"]:
+        old = before.get((r["case"], r["param"]))
+        if old is None or "error" in r:
+            continue
+        ratio = r["mb_s"] / old["mb_s"]
+        flag  = "  REGRESSION" if ratio < 1 - tolerance else ""
+        print(f"  {r['case']}[{r['param']}]: {old['mb_s']:.2f} -> {r['mb_s']:.2f} MB/s ({ratio:.2f}x){flag}")
+        if flag:
+            slower.append(r)
+    return slower
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        case, param, data_dir, model = sys.argv[2:6]
+        data = json.loads((Path(data_dir) / "info.json").read_text())
+        param = param if case == "sentiment" else int(param)
+        out = run_case(case, param, data, Path(data_dir) / "work", model or None)
+        (Path(data_dir) / "work" / "result.json").write_text(json.dumps(out))
+        sys.exit(0)
+
+    all_cases = ["scrape", "scrape2_ids", "scrape2_comments", "sentiment"]
+    ap = argparse.ArgumentParser(description="Benchmark the scanners and sentiment stage on synthetic dumps.")
+    ap.add_argument("cases", nargs="*", metavar="CASE", help=f"default: {', '.join(all_cases)}")
+    ap.add_argument("--size-mb", type=float, default=SIZE_MB)
+    ap.add_argument("--match-rate", type=float, default=synth_dump.MATCH_RATE)
+    ap.add_argument("--comment-share", type=float, default=synth_dump.COMMENT_SHARE)
+    ap.add_argument("--malformed", type=float, default=synth_dump.MALFORMED)
+    ap.add_argument("--long-rate", type=float, default=synth_dump.LONG_RATE)
+    ap.add_argument("--seed", type=int, default=synth_dump.SEED)
+    ap.add_argument("--workers", default=",".join(map(str, WORKERS)), help="e.g. 1,4,8")
+    ap.add_argument("--backends", default=",".join(BACKENDS), help="sentiment backends, e.g. torch,onnx")
+    ap.add_argument("--model", default=MODEL, help="sentiment model name or local path")
+    ap.add_argument("--repeat", type=int, default=REPEAT)
+    ap.add_argument("--results", default=RESULTS, help="JSON lines file the record is appended to")
+    ap.add_argument("--compare", action="store_true", help="compare with the previous record afterwards")
+    args = ap.parse_args()
+
+    cases = args.cases or all_cases
+    unknown = set(cases) - set(all_cases)
+    if unknown:
+        ap.error(f"unknown case(s): {', '.join(sorted(unknown))}")
+
+    data = dataset(args.size_mb, args.seed, comment_share=args.comment_share,
+                   match_rate=args.match_rate, malformed=args.malformed, long_rate=args.long_rate)
+    record = benchmark(cases, data, [int(w) for w in args.workers.split(",")],
+                       args.backends.split(","), args.repeat, args.model)
+    with open(args.results, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+    print(f"appended to {args.results}")
+
+    if args.compare:
+        with open(args.results, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        sys.exit(1 if compare(records) else 0)
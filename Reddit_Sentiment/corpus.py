@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+import os
+import glob
+
+import pandas as pd
+
+
+# Typed, columnar form of the filtered Reddit corpus. The scrapers can write
+# it instead of RawRedditCount/*.csv (give the output a .parquet name), and
+# every reader goes through load_corpus() so it works with either format.
+# In Parquet created_utc is int64 epoch seconds, subreddit/type/label are
+# dictionary-encoded, scores are ints, and embedded newlines in `text` are
+# just data, so there are no malformed rows to skip.
+# ── CONFIG ───────────────────────────────────────────────────────────────
+ROW_GROUP_ROWS   = 65_536      # rows buffered per Parquet row group
+COMPRESSION      = "zstd"
+INT_COLUMNS      = {"created_utc", "score", "num_comments", "dup_group", "dup_size"}
+CATEGORY_COLUMNS = {"subreddit", "type", "twitter_label"}
+
+
+def _int(v):
+    # scores etc. as ints; anything unparseable becomes null
+    if v is None or isinstance(v, int):
+        return v
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def parquet_schema(columns):
+    import pyarrow as pa
+    types = {}
+    for col in columns:
+        if col in INT_COLUMNS:
+            types[col] = pa.int64()
+        elif col in CATEGORY_COLUMNS:
+            types[col] = pa.dictionary(pa.int32(), pa.string())
+        else:
+            types[col] = pa.string()
+    return pa.schema(list(types.items()))
+
+
+# ── 1) WRITE: PARQUET DATASET IN ROW GROUPS ──────────────────────────────
+class ParquetParts:
+    # A dataset directory of part-NNNNN.parquet files, filled row group by
+    # row group with the same writerow()/writerows() calls as csv.writer.
+    # flush() closes the current part so everything so far is readable, and
+    # tell() is the number of closed parts; that is what ResumableScan
+    # checkpoints, and `keep` drops any parts written after the checkpoint.
+    def __init__(self, path, columns, keep=0):
+        import pyarrow.parquet as pq
+        self.pq      = pq
+        self.path    = path
+        self.columns = list(columns)
+        self.schema  = parquet_schema(self.columns)
+        self.buffer  = []
+        self.writer  = None
+
+        os.makedirs(path, exist_ok=True)
+        for stale in glob.glob(os.path.join(path, "*.tmp")):
+            os.remove(stale)
+        for stale in self.parts()[keep:]:
+            os.remove(stale)
+        self.nparts = len(self.parts())
+
+    def parts(self):
+        return sorted(glob.glob(os.path.join(self.path, "part-*.parquet")))
+
+    def _part_path(self):
+        return os.path.join(self.path, f"part-{self.nparts:05d}.parquet")
+
+    def writerow(self, row):
+        self.buffer.append(row)
+        if len(self.buffer) >= ROW_GROUP_ROWS:
+            self._write_group()
+
+    def writerows(self, rows):
+        for row in rows:
+            self.writerow(row)
+
+    def write_frame(self, df):
+        # a DataFrame chunk with (at least) self.columns; ISO created_utc
+        # strings from a CSV corpus become epoch seconds like the scrapers write
+        if "created_utc" in df.columns and not pd.api.types.is_numeric_dtype(df["created_utc"]):
+            stamps = pd.to_datetime(df["created_utc"], errors="coerce")
+            df = df.assign(created_utc=(stamps - pd.Timestamp(0)) // pd.Timedelta(seconds=1))
+        self.writerows(df[self.columns].itertuples(index=False, name=None))
+
+    def _write_group(self):
+        import pyarrow as pa
+        cols = list(zip(*self.buffer)) if self.buffer else [()] * len(self.columns)
+        arrays = []
+        for name, values, field in zip(self.columns, cols, self.schema):
+            if name in INT_COLUMNS:
+                values = [_int(v) for v in values]
+            else:
+                values = [None if v is None else str(v) for v in values]
+            if pa.types.is_dictionary(field.type):
+                arrays.append(pa.array(values, pa.string()).dictionary_encode())
+            else:
+                arrays.append(pa.array(values, field.type))
+        table = pa.Table.from_arrays(arrays, schema=self.schema)
+        if self.writer is None:
+            # written under a .tmp name until the part is complete
+            self.writer = self.pq.ParquetWriter(self._part_path() + ".tmp", self.schema,
+                                                compression=COMPRESSION)
+        self.writer.write_table(table)
+        self.buffer = []
+
+    def flush(self):
+        if self.buffer:
+            self._write_group()
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+            os.replace(self._part_path() + ".tmp", self._part_path())
+            self.nparts += 1
+
+    def tell(self):
+        return self.nparts
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ── 2) READ: ONLY THE COLUMNS YOU NEED ───────────────────────────────────
+def load_corpus(path, columns=None, dates=True, **csv_kwargs):
+    # Parquet (file or dataset directory) or CSV. With dates=True
+    # created_utc comes back as datetime64 either way, otherwise as stored
+    # (epoch ints / ISO strings). csv_kwargs only apply to CSV input.
+    if str(path).endswith(".parquet"):
+        df = pd.read_parquet(path, columns=columns)
+        if dates and "created_utc" in df.columns:
+            df["created_utc"] = pd.to_datetime(df["created_utc"], unit="s")
+        return df
+
+    if columns is not None:
+        csv_kwargs.setdefault("usecols", columns)
+    if dates and (columns is None or "created_utc" in columns):
+        csv_kwargs.setdefault("parse_dates", ["created_utc"])
+    return pd.read_csv(path, **csv_kwargs)
+
+
+def iter_corpus(path, chunksize, columns=None, skip=0, **csv_kwargs):
+    # the same data as load_corpus(..., dates=False) in DataFrames of at most
+    # `chunksize` rows, leaving out the first `skip` rows (already processed)
+    if str(path).endswith(".parquet"):
+        import pyarrow.dataset as ds
+        frames = (b.to_pandas() for b in
+                  ds.dataset(path, format="parquet").to_batches(columns=columns, batch_size=chunksize))
+    else:
+        if columns is not None:
+            csv_kwargs.setdefault("usecols", columns)
+        frames = pd.read_csv(path, chunksize=chunksize, **csv_kwargs)
+
+    seen = 0
+    for df in frames:
+        start, seen = seen, seen + len(df)
+        if seen <= skip:
+            continue
+        yield df.iloc[skip - start:] if start < skip else df
+
+
+def save_corpus(df, path, **csv_kwargs):
+    # .parquet gets the typed layout above, anything else df.to_csv(**csv_kwargs)
+    if str(path).endswith(".parquet"):
+        df = df.astype({c: "category" for c in CATEGORY_COLUMNS if c in df.columns})
+        df.to_parquet(path, index=False, compression=COMPRESSION)
+    else:
+        df.to_csv(path, **csv_kwargs)
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+import os
+import re
+import hashlib
+import argparse
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from corpus import iter_corpus, ParquetParts
+from monthly_cube import MonthlyCube, output_position
+
+
+# Groups cross-posted, reposted and lightly edited posts between the
+# scrapers and Sentiment_Analysis.py. The text compared is the one that gets
+# scored (title for submissions, text for comments), normalized: NFKC,
+# casefolded, URLs dropped, punctuation and whitespace runs collapsed.
+#   exact duplicates  same normalized text -> same blake2b key
+#   near duplicates   MinHash signatures over SHINGLE-byte shingles of each
+#                     distinct text, LSH banding for candidates, kept if
+#                     the estimated Jaccard similarity is >= THRESHOLD
+# Candidates are only checked against the first text of their LSH bucket,
+# so the work grows linearly with the rows; groups are joined through a
+# union-find. Every row gets
+#   dup_group  row number of the group's first row (0-based, in file order;
+#              ids can be missing or repeated, row numbers can't)
+#   dup_size   rows in the group
+# in <input>_dedup.csv, and the first row of every group alone goes to
+# <input>_groups.csv (what the volume plot counts with COUNT_GROUPS).
+# Sentiment_Analysis.py scores one row per dup_group and gives its label to
+# the rest of the group.
+# ── CONFIG ───────────────────────────────────────────────────────────────
+INPUT_CSV  = "RawRedditCount/Economics_debt_deficit_posts.csv"
+CHUNK_ROWS = 100_000
+
+NUM_PERM    = 64         # MinHash values per text
+BANDS       = 16         # LSH bands of NUM_PERM // BANDS values each
+THRESHOLD   = 0.7        # estimated Jaccard similarity for a near duplicate
+SHINGLE     = 5          # bytes per shingle of the normalized text
+BATCH_BYTES = 1 << 16    # text bytes hashed per numpy batch
+SEED        = 1
+
+# rows that say nothing (dropped by Sentiment_Analysis.py) stay on their own
+DROP_TEXTS = ["[deleted]", "[removed]"]
+
+URL      = re.compile(r"https?://\S+|www\.\S+")
+NON_WORD = re.compile(r"[\W_]+")
+
+
+# ── 1) TEXT → KEY ────────────────────────────────────────────────────────
+def compared_text(df):
+    # the text Sentiment_Analysis.py scores: title for submissions, else text
+    title = df["title"] if "title" in df.columns else pd.Series("", index=df.index)
+    text  = df["text"] if "text" in df.columns else pd.Series("", index=df.index)
+    is_submission = df["type"].astype(str).str.strip().str.lower().eq("submission")
+    return title.where(is_submission, text).fillna("").astype(str)
+
+
+def normalize(text):
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return " ".join(NON_WORD.sub(" ", URL.sub(" ", text)).split())
+
+
+def text_key(norm):
+    return hashlib.blake2b(norm.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+
+# ── 2) MINHASH SIGNATURES ────────────────────────────────────────────────
+class MinHasher:
+    # multiply-shift hashes of each SHINGLE-byte shingle (which fits a
+    # uint64 as is); a text's signature is the minimum of every hash
+    def __init__(self, num_perm=NUM_PERM, shingle=SHINGLE, seed=SEED):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, 2**63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = rng.integers(0, 2**63, num_perm, dtype=np.uint64)
+        self.shingle = shingle
+        self.weights = np.uint64(256) ** np.arange(shingle, dtype=np.uint64)
+
+    def signatures(self, texts):
+        # (len(texts), num_perm) uint32, in batches of about BATCH_BYTES
+        out, batch, size = [], [], 0
+        for t in texts:
+            batch.append(t.encode("utf-8", "surrogatepass").ljust(self.shingle))
+            size += len(batch[-1])
+            if size >= BATCH_BYTES:
+                out.append(self._batch(batch))
+                batch, size = [], 0
+        if batch:
+            out.append(self._batch(batch))
+        return np.concatenate(out) if out else np.empty((0, len(self.a)), dtype=np.uint32)
+
+    def _batch(self, encoded):
+        k = self.shingle
+        lens   = np.array([len(e) for e in encoded])
+        ends   = np.cumsum(lens)
+        starts = ends - lens
+        buf = np.frombuffer(b"".join(encoded) + b"\0" * (k - 1), dtype=np.uint8)
+        grams = np.lib.stride_tricks.sliding_window_view(buf, k).astype(np.uint64) @ self.weights
+        # shingles running into the next text are replaced by the text's
+        # first shingle (every text is at least `k` bytes, so it has one)
+        owner = np.repeat(np.arange(len(encoded)), lens)
+        valid = np.arange(len(owner)) + k <= ends[owner]
+        grams[~valid] = grams[starts[owner[~valid]]]
+        # one row per hash function: the minimum runs along contiguous memory
+        hashed = ((self.a[:, None] * grams + self.b[:, None]) >> np.uint64(32)).astype(np.uint32)
+        return np.minimum.reduceat(hashed, starts, axis=1).T
+
+
+# ── 3) LSH CANDIDATES → GROUPS ───────────────────────────────────────────
+def find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def near_duplicates(sigs, bands=BANDS, threshold=THRESHOLD):
+    # pairs (i, j), i < j, of signatures agreeing in one whole band and on
+    # at least `threshold` of all their values
+    if len(sigs) < 2:
+        return np.empty((0, 2), dtype=np.int64)
+    rows = sigs.shape[1] // bands
+    mix  = np.random.default_rng(SEED).integers(1, 2**63, rows, dtype=np.uint64) | np.uint64(1)
+    pairs = []
+    for b in range(bands):
+        keys  = sigs[:, b * rows:(b + 1) * rows].astype(np.uint64) @ mix
+        order = np.argsort(keys, kind="stable")
+        keys  = keys[order]
+        new_bucket = np.r_[True, keys[1:] != keys[:-1]]
+        leader = order[np.flatnonzero(new_bucket)[np.cumsum(new_bucket) - 1]]
+        cand = order != leader
+        i, j = leader[cand], order[cand]
+        similar = (sigs[i] == sigs[j]).mean(axis=1) >= threshold
+        pairs.append(np.stack([i[similar], j[similar]], axis=1))
+    return np.concatenate(pairs) if pairs else np.empty((0, 2), dtype=np.int64)
+
+
+def find_groups(input_path, chunk_rows=CHUNK_ROWS, hasher=None):
+    # -> (first row of each row's group, rows per group) as arrays by row
+    hasher = hasher or MinHasher()
+    uid_of, first_row, row_uid, n = {}, [], [], 0
+    sig_uid, sigs = [], []                     # distinct texts that get a signature
+    for df in iter_corpus(input_path, chunk_rows, dtype=str):
+        new_texts = []
+        for raw in compared_text(df):
+            norm = normalize(raw)
+            alone = not norm or raw.strip().lower() in DROP_TEXTS
+            key = n if alone else text_key(norm)
+            uid = uid_of.get(key)
+            if uid is None:
+                uid = uid_of[key] = len(first_row)
+                first_row.append(n)
+                if not alone:
+                    sig_uid.append(uid)
+                    new_texts.append(norm)
+            row_uid.append(uid)
+            n += 1
+        sigs.append(hasher.signatures(new_texts))
+
+    sigs    = np.concatenate(sigs) if sigs else np.empty((0, len(hasher.a)), dtype=np.uint32)
+    sig_uid = np.asarray(sig_uid, dtype=np.int64)
+    pairs   = sig_uid[near_duplicates(sigs)]
+
+    parent = list(range(len(first_row)))
+    for i, j in pairs.tolist():
+        ri, rj = find(parent, i), find(parent, j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)  # the root is the earliest text
+    root = np.array([find(parent, u) for u in range(len(parent))], dtype=np.int64)
+
+    first_row = np.asarray(first_row, dtype=np.int64)
+    group = first_row[root[np.asarray(row_uid, dtype=np.int64)]] if n else np.empty(0, dtype=np.int64)
+    size  = np.bincount(group, minlength=n)[group]
+    return group, size
+
+
+# ── 4) WRITE BOTH OUTPUTS ────────────────────────────────────────────────
+def open_writer(path, columns):
+    if str(path).endswith(".parquet"):
+        return ParquetParts(path, columns)
+    return open(f"{path}.tmp", "w", newline="", encoding="utf-8")
+
+
+def write_chunk(out, df):
+    if isinstance(out, ParquetParts):
+        out.write_frame(df)
+    else:
+        df.to_csv(out, header=out.tell() == 0, index=False)
+
+
+def close_writer(out, path):
+    out.close()
+    if not isinstance(out, ParquetParts):
+        os.replace(f"{path}.tmp", path)
+
+
+def frames(input_path, chunk_rows):
+    # the input in chunks; a header-only input gives one empty chunk, so
+    # both outputs are still written (header only) for the next stage
+    empty = True
+    for df in iter_corpus(input_path, chunk_rows, dtype=str):
+        empty = False
+        yield df
+    if empty:
+        yield (pd.read_parquet(input_path) if str(input_path).endswith(".parquet")
+               else pd.read_csv(input_path, nrows=0, dtype=str))
+
+
+def default_outputs(input_path):
+    stem, ext = os.path.splitext(str(input_path))
+    return f"{stem}_dedup{ext}", f"{stem}_groups{ext}"
+
+
+def run(input_path=INPUT_CSV, output_path=None, groups_path=None, chunk_rows=CHUNK_ROWS):
+    dedup_default, groups_default = default_outputs(input_path)
+    output_path = output_path or dedup_default
+    groups_path = groups_path or groups_default
+
+    group, size = find_groups(input_path, chunk_rows)
+    print(f"{len(group):,} rows in {len(np.unique(group)):,} groups "
+          f"({int((size > 1).sum()):,} rows have duplicates)")
+
+    outs, start = None, 0
+    cube = MonthlyCube(groups_path)
+    cube.reset()
+    for df in frames(input_path, chunk_rows):
+        rows = np.arange(start, start + len(df))
+        start += len(df)
+        is_first = group[rows] == rows
+        df = df.assign(dup_group=group[rows], dup_size=size[rows])
+
+        if outs is None:
+            outs = (open_writer(output_path, list(df.columns)),
+                    open_writer(groups_path, list(df.columns)))
+        write_chunk(outs[0], df)
+        write_chunk(outs[1], df[is_first])
+        cube.add_frame(df[is_first])
+
+    if outs is not None:
+        close_writer(outs[0], output_path)
+        close_writer(outs[1], groups_path)
+        cube.commit(output_position(groups_path))
+    cube.close()
+    print(f"Saved '{output_path}' and '{groups_path}'")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Group exact and near-duplicate posts before sentiment scoring.")
+    ap.add_argument("input", nargs="?", default=INPUT_CSV, help="scraper output (CSV or .parquet)")
+    ap.add_argument("--output", help="every row plus dup_group/dup_size (default <input>_dedup)")
+    ap.add_argument("--groups", help="first row of every group (default <input>_groups)")
+    ap.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = ap.parse_args()
+    run(args.input, args.output, args.groups, args.chunk_rows)
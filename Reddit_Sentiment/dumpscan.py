@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+import os
+import json
+import time
+from collections import Counter, deque
+from multiprocessing import Pool
+
+import zstandard as zstd
+
+from corpus import ParquetParts
+
+
+# Shared plumbing for scanning the Pushshift .zst dumps in line-aligned chunks,
+# optionally spread over a process pool, with resumable output.
+# ── CONFIG ───────────────────────────────────────────────────────────────
+CHUNK_BYTES        = 16 * 2**20   # decompressed bytes handed to a worker at a time
+MAX_WINDOW_SIZE    = 2**31        # the dumps are compressed with --long=31
+CHECKPOINT_SECONDS = 60           # how often a resumable scan saves its sidecar
+PROGRESS_SECONDS   = 30           # how often it prints progress (0 = never)
+PHASES             = ["decompress", "prefilter", "decode", "parse", "match", "write"]
+ZSTD_MAGIC         = b"\x28\xb5\x2f\xfd"
+
+
+# ── 1) DECOMPRESS INTO LINE-ALIGNED CHUNKS ───────────────────────────────
+def iter_chunks(input_zst, chunk_bytes=CHUNK_BYTES, start=0, skip=0):
+    # every chunk ends right after a b"\n", so it holds whole lines only and
+    # can be decoded/parsed on its own (the last one may lack the newline).
+    # Yields (chunk, compressed offset read up to); the last item is the
+    # remainder read at end of file, which may be empty. Decompression starts
+    # at compressed offset `start` (a frame boundary) and drops the first
+    # `skip` decompressed bytes; frames appended to the file are read too.
+    with open(input_zst, "rb") as ifh:
+        ifh.seek(start)
+        dctx   = zstd.ZstdDecompressor(max_window_size=MAX_WINDOW_SIZE)
+        reader = dctx.stream_reader(ifh, read_across_frames=True, closefd=False)
+        if skip:
+            reader.seek(skip)
+        tail = b""
+        while True:
+            block = reader.read(chunk_bytes)
+            if not block:
+                break
+            block = tail + block
+            cut = block.rfind(b"\n") + 1
+            if cut == 0:               # one very long line, keep reading
+                tail = block
+                continue
+            tail = block[cut:]
+            yield block[:cut], ifh.tell()
+        yield tail, ifh.tell()
+
+
+def split_lines(chunk):
+    # same lines io.TextIOWrapper(..., encoding="utf-8") would produce
+    # (universal newlines), minus the line terminators, still as raw bytes
+    if b"\r" in chunk:
+        chunk = chunk.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+    lines = chunk.split(b"\n")
+    if lines[-1] == b"":
+        lines.pop()
+    return lines
+
+
+# ── 2) ORDERED, MEMORY-BOUNDED PARALLEL MAP ──────────────────────────────
+def map_chunks(func, chunks, workers=1, max_pending=None, initializer=None, initargs=()):
+    # results come back in input order; at most `max_pending` chunks are in
+    # flight at once, so memory stays bounded however fast decompression is.
+    # `initializer(*initargs)` sets up per-process state (e.g. an id set)
+    if workers <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+        for chunk in chunks:
+            yield func(chunk)
+        return
+
+    max_pending = max_pending or 2 * workers
+    with Pool(workers, initializer, initargs) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(func, (chunk,)))
+            if len(pending) >= max_pending:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+# ── 3) RESUMABLE / INCREMENTAL OUTPUT ────────────────────────────────────
+class ResumableScan:
+    # One output fed from one or more .zst dumps, with a JSON sidecar
+    # (<output>.ckpt.json) recording, per dump, how far it has been processed
+    # and how far the output had got at that point:
+    #   base  compressed offset of the first frame not fully processed
+    #   skip  decompressed bytes after `base` already processed
+    #   compressed / lines   progress info for the current pass
+    # A checkpoint is only taken between chunk results, so the output can
+    # always be cut back to it. With resume=True a run truncates the output
+    # to the checkpoint and carries on from there; dumps that were finished
+    # are skipped unless they have grown (new monthly frames appended), in
+    # which case only the new frames are read.
+    # The output is a text file, or a Parquet dataset directory when its
+    # name ends in .parquet (then "how far" counts finished part files).
+    # An `aggregate` (a MonthlyCube, a ThreadIndex, or a list of them) is
+    # committed with every checkpoint and brought back in line with the
+    # output when it is reopened.
+    #
+    # Instrumentation: the chunk functions add per-chunk counts and phase
+    # times ("t_<phase>" seconds) to the counts they return, the scan adds
+    # its own decompression and write times. That is a handful of clock
+    # reads per 16 MB chunk, so it is always on; every `progress` seconds a
+    # progress line is printed (bytes read vs file size, ETA, lines/s,
+    # matches, bad JSON), and finish() writes everything to
+    # <output>.stats.json.
+    def __init__(self, inputs, output, resume=False, every=CHECKPOINT_SECONDS, aggregate=None,
+                 progress=PROGRESS_SECONDS):
+        self.inputs     = [inputs] if isinstance(inputs, (str, os.PathLike)) else list(inputs)
+        self.output     = str(output)
+        self.ckpt_path  = f"{output}.ckpt.json"
+        self.every      = every
+        self.pending    = deque()
+        self.saved_at   = time.monotonic()
+        self.consistent = True
+        self.aggregates = ([] if aggregate is None else
+                           list(aggregate) if isinstance(aggregate, (list, tuple)) else [aggregate])
+
+        self.state = {"inputs": {}, "output": 0, "counts": {}}
+        if resume and os.path.exists(self.ckpt_path) and os.path.exists(output):
+            with open(self.ckpt_path, encoding="utf-8") as f:
+                self.state = json.load(f)
+        self.fresh  = self.state["output"] == 0
+        self.counts = Counter(self.state["counts"])
+
+        self.stats_path  = f"{output}.stats.json"
+        self.progress    = progress
+        self.started     = time.monotonic()
+        self.printed_at  = self.started
+        self.counts_then = Counter(self.counts)       # to tell this run's work apart
+        self.read_then   = self.compressed_done()
+
+    def open(self, columns=None, **kwargs):
+        # the output, cut back to the checkpoint: a text file (kwargs go to
+        # open()), or for .parquet a ParquetParts sink with these columns
+        if self.output.endswith(".parquet"):
+            outf = ParquetParts(self.output, columns, keep=self.state["output"])
+        elif self.fresh:
+            outf = open(self.output, "w", **kwargs)
+        else:
+            if os.path.getsize(self.output) < self.state["output"]:
+                raise RuntimeError(f"{self.output} is shorter than its checkpoint; rerun without resume")
+            with open(self.output, "r+b") as f:
+                f.truncate(self.state["output"])
+            outf = open(self.output, "a", **kwargs)
+        for aggregate in self.aggregates:
+            aggregate.sync(self.state["output"])
+        return outf
+
+    def chunks(self, chunk_bytes=CHUNK_BYTES):
+        # the not-yet-processed chunks of every input, in order
+        for path in self.inputs:
+            key  = str(path)
+            info = self.state["inputs"].setdefault(key, {"base": 0, "skip": 0})
+            if info["skip"] == 0 and info["base"] >= os.path.getsize(path):
+                continue                          # nothing new in this dump
+            if info["base"]:
+                with open(path, "rb") as f:
+                    f.seek(info["base"])
+                    if f.read(4) != ZSTD_MAGIC:
+                        raise RuntimeError(f"{path} changed in place since the last run; rerun without resume")
+
+            done   = info["skip"]
+            chunks = iter_chunks(path, chunk_bytes, info["base"], info["skip"])
+            while True:
+                t0 = time.perf_counter()
+                try:
+                    chunk, compressed = next(chunks)
+                except StopIteration:
+                    break
+                self.counts["t_decompress"] += time.perf_counter() - t0
+                if chunk:
+                    done += len(chunk)
+                    self.pending.append((key, done, compressed, chunk.count(b"\n")))
+                    yield chunk
+            # end of input: every frame up to where the reader stopped is done
+            self.pending.append((key, None, compressed, 0))
+
+    def done(self, outf, counts=None):
+        # call once per chunk result, after its rows are written to outf
+        if counts:
+            self.counts += counts
+        # exactly one chunk entry is consumed, together with the end-of-input
+        # markers around it (an input's marker follows its last chunk). With
+        # workers, pending already holds chunks of later inputs that aren't
+        # written yet: those stay queued
+        chunk_seen = False
+        while self.pending:
+            if self.pending[0][1] is not None:
+                if chunk_seen:
+                    break
+                chunk_seen = True
+            key, skip, compressed, lines = self.pending.popleft()
+            info = self.state["inputs"][key]
+            if skip is None:
+                info.update(base=compressed, skip=0)
+            else:
+                info.update(skip=skip, compressed=compressed, lines=info.get("lines", 0) + lines)
+        self.consistent = True
+        if time.monotonic() - self.saved_at >= self.every:
+            self.save(outf)
+        if self.progress and time.monotonic() - self.printed_at >= self.progress:
+            print(self.progress_line(), flush=True)
+            self.printed_at = time.monotonic()
+
+    def write_all(self, outf, results, write):
+        # write(payload) every (payload, counts) chunk result, checkpointing
+        # as we go; on Ctrl-C or a crash between chunks that point is saved,
+        # otherwise the last periodic checkpoint stands
+        try:
+            for payload, counts in results:
+                self.consistent = False
+                t0 = time.perf_counter()
+                write(payload)
+                self.counts["t_write"] += time.perf_counter() - t0
+                self.done(outf, counts)
+        except BaseException:
+            if self.consistent:
+                self.save(outf)
+            raise
+        self.finish(outf)
+
+    def finish(self, outf):
+        # inputs with no chunks left still need their end markers applied
+        while self.pending and self.pending[0][1] is None:
+            key, _, compressed, _ = self.pending.popleft()
+            self.state["inputs"][key].update(base=compressed, skip=0)
+        self.save(outf)
+        stats = self.stats()
+        tmp = self.stats_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(stats, f, indent=1)
+        os.replace(tmp, self.stats_path)
+        if self.progress:
+            print(self.progress_line())
+            print("time: " + ", ".join(f"{phase} {share:.0%}" for phase, share in stats["time_share"].items()))
+
+    def save(self, outf):
+        outf.flush()
+        self.state["output"] = outf.tell()
+        self.state["counts"] = dict(self.counts)
+        for aggregate in self.aggregates:
+            aggregate.commit(self.state["output"])
+        tmp = self.ckpt_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=1)
+        os.replace(tmp, self.ckpt_path)
+        self.saved_at = time.monotonic()
+
+    # ── progress / summary ───────────────────────────────────────────────
+    def compressed_done(self):
+        # compressed bytes of all inputs processed so far (finished dumps whole)
+        done = 0
+        for path in self.inputs:
+            info = self.state["inputs"].get(str(path), {})
+            if info.get("skip", 0) == 0:
+                done += info.get("base", 0)
+            else:
+                done += info.get("compressed", info["base"])
+        return done
+
+    def progress_line(self):
+        total   = sum(os.path.getsize(p) for p in self.inputs)
+        done    = self.compressed_done()
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        rate    = (done - self.read_then) / elapsed
+        eta     = (total - done) / rate if rate > 0 else float("inf")
+        lines   = self.counts["lines"] - self.counts_then["lines"]
+        eta_txt = "?" if eta == float("inf") else time.strftime("%H:%M:%S", time.gmtime(eta))
+        return (f"{os.path.basename(self.output)}: {done / 2**20:,.0f}/{total / 2**20:,.0f} MB "
+                f"({done / max(total, 1):.1%}), {lines / elapsed:,.0f} lines/s, "
+                f"{self.counts['matched']:,} matched, {self.counts['bad_json']:,} bad JSON, "
+                f"ETA {eta_txt}")
+
+    def stats(self):
+        # counts over all runs of this output, rates over this run only
+        elapsed = time.monotonic() - self.started
+        phases  = {p: self.counts[f"t_{p}"] for p in PHASES if f"t_{p}" in self.counts}
+        spent   = sum(phases.values()) or 1.0
+
+        def prefixed(prefix):
+            return dict(sorted(((k[len(prefix):], v) for k, v in self.counts.items()
+                                if k.startswith(prefix)), key=lambda kv: -kv[1]))
+
+        return {
+            "output":           self.output,
+            "inputs":           {str(p): os.path.getsize(p) for p in self.inputs},
+            "elapsed_s":        round(elapsed, 3),
+            "compressed_read":  self.compressed_done() - self.read_then,
+            "lines_per_s":      round((self.counts["lines"] - self.counts_then["lines"]) / max(elapsed, 1e-9), 1),
+            "counts":           {k: v for k, v in self.counts.items() if ":" not in k and not k.startswith("t_")},
+            "terms":            prefixed("term:"),
+            "subreddits":       prefixed("subreddit:"),
+            # seconds summed over all processes, so with workers they can
+            # add up to more than elapsed_s
+            "time_s":           {k: round(v, 3) for k, v in phases.items()},
+            "time_share":       {k: round(v / spent, 4) for k, v in phases.items()},
+        }
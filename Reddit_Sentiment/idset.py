@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+import re
+
+import numpy as np
+
+
+# Compact set of Reddit base-36 IDs ("6ry83", "t3_"-stripped link ids, ...).
+# Canonical IDs (lowercase base 36, no leading zeros, <= 12 digits so they
+# fit an int64) live in one sorted int64 array: 8 bytes each instead of a
+# ~60-byte str in a Python set. Anything else goes to a small fallback set,
+# so membership means exactly what it would for the original strings.
+CANONICAL = re.compile(r"(?:0|[1-9a-z][0-9a-z]{0,11})")
+
+
+def encode(id36):
+    # int64 key for a canonical id, None otherwise
+    if CANONICAL.fullmatch(id36):
+        return int(id36, 36)
+    return None
+
+
+def decode(key):
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    out = ""
+    while True:
+        key, r = divmod(int(key), 36)
+        out = digits[r] + out
+        if not key:
+            return out
+
+
+class IdSet:
+    def __init__(self, ids=()):
+        self.keys    = np.empty(0, dtype=np.int64)
+        self.other   = set()
+        self.pending = []
+        self.update(ids)
+
+    def update(self, ids):
+        ints = []
+        for i in ids:
+            key = encode(i)
+            if key is None:
+                self.other.add(i)
+            else:
+                ints.append(key)
+        if ints:
+            self.pending.append(np.array(ints, dtype=np.int64))
+
+    def _merge(self):
+        # sort everything added since the last lookup in one go
+        if self.pending:
+            self.keys    = np.unique(np.concatenate([self.keys, *self.pending]))
+            self.pending = []
+
+    def __contains__(self, id36):
+        key = encode(id36)
+        if key is None:
+            return id36 in self.other
+        self._merge()
+        i = np.searchsorted(self.keys, key)
+        return i < len(self.keys) and self.keys[i] == key
+
+    def __len__(self):
+        self._merge()
+        return len(self.keys) + len(self.other)
+
+    def __iter__(self):
+        self._merge()
+        yield from (decode(k) for k in self.keys)
+        yield from self.other
+
+    def __getstate__(self):
+        self._merge()
+        return self.__dict__
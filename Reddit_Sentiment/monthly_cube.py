@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+import os
+import sqlite3
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import pandas as pd
+
+from corpus import iter_corpus
+
+
+# Pre-aggregated months for the plot scripts: per output file ("source"),
+# row counts and score sums by month x subreddit x type x label. The
+# scrapers and Sentiment_Analysis.py add their rows as they write them and
+# commit together with their checkpoints, storing the output position the
+# cube matches. Anything that doesn't match (a crash between the two, a file
+# written before the cube existed) is rebuilt from the file once; after that
+# the plots read a few hundred rows instead of the whole corpus.
+# ── CONFIG ───────────────────────────────────────────────────────────────
+# MONTHLY_CUBE=<path> puts it elsewhere (e.g. benchmark runs on scratch data)
+CUBE_PATH     = os.environ.get("MONTHLY_CUBE") or Path(__file__).resolve().parent / "monthly_cube.sqlite"
+REBUILD_ROWS  = 100_000       # rows per chunk when rebuilding from a file
+# scores are clamped to this (valid JSON, absurd as a score) so sums stay
+# in SQLite's int64; sums past int64 are stored as REAL
+SCORE_LIMIT   = 2**62
+INT64_MAX     = 2**63 - 1
+
+
+def output_position(output):
+    # what a checkpoint records for `output`: bytes for CSV, parts for Parquet
+    output = str(output)
+    if output.endswith(".parquet"):
+        return len(list(Path(output).glob("part-*.parquet"))) if os.path.isdir(output) else 1
+    return os.path.getsize(output)
+
+
+def _month(ts):
+    # "YYYY-MM" from epoch seconds or an ISO timestamp string
+    if isinstance(ts, str):
+        return ts[:7]
+    t = time.gmtime(int(ts))
+    return f"{t.tm_year:04d}-{t.tm_mon:02d}"
+
+
+def _int(v):
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _score(v):
+    return max(-SCORE_LIMIT, min(SCORE_LIMIT, _int(v)))
+
+
+def _bind(total):
+    return total if -INT64_MAX <= total <= INT64_MAX else float(total)
+
+
+class MonthlyCube:
+    def __init__(self, output, columns=None, path=CUBE_PATH):
+        # columns: the row layout add_rows() gets (a scraper's HEADER)
+        self.source = os.path.abspath(output)
+        self.output = str(output)
+        self.db = sqlite3.connect(path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS cube (
+                source TEXT, month TEXT, subreddit TEXT, type TEXT, label TEXT,
+                n INTEGER, score_sum INTEGER,
+                PRIMARY KEY (source, month, subreddit, type, label)) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS sources (source TEXT PRIMARY KEY, position INTEGER);
+        """)
+        self.deltas = defaultdict(lambda: [0, 0])
+        if columns is not None:
+            col = {c: i for i, c in enumerate(columns)}
+            self.idx = [col["created_utc"], col["subreddit"], col["type"],
+                        col.get("twitter_label"), col["score"]]
+
+    # ── adding rows ──────────────────────────────────────────────────────
+    def add_rows(self, rows):
+        # lists in the `columns` order given to __init__
+        t, s, ty, lab, sc = self.idx
+        for row in rows:
+            d = self.deltas[(_month(row[t]), row[s] or "", row[ty] or "",
+                             "" if lab is None else row[lab] or "")]
+            d[0] += 1
+            d[1] += _score(row[sc])
+
+    def add_frame(self, df):
+        # a DataFrame chunk with created_utc and, where present,
+        # subreddit/type/score/twitter_label, as stored or as read back
+        df = df[df["created_utc"].notna()]
+        if df.empty:
+            return
+        created = df["created_utc"]
+        if pd.api.types.is_numeric_dtype(created):
+            month = pd.to_datetime(created, unit="s").dt.strftime("%Y-%m")
+        else:
+            month = created.astype(str).str[:7]
+
+        def text(col):
+            # missing columns (e.g. no subreddit in an older export) count as ""
+            if col not in df.columns:
+                return ""
+            return df[col].astype(object).fillna("").astype(str).to_numpy()
+
+        score = 0
+        if "score" in df.columns:
+            score = (pd.to_numeric(df["score"], errors="coerce").fillna(0)
+                     .clip(-SCORE_LIMIT, SCORE_LIMIT).astype("int64").to_numpy())
+            # huge scores are summed as python ints, an int64 sum would wrap
+            if abs(score).max() > INT64_MAX // len(score):
+                score = score.astype(object)
+
+        keys = pd.DataFrame({
+            "month":     month.to_numpy(),
+            "subreddit": text("subreddit"),
+            "type":      text("type"),
+            "label":     text("twitter_label"),
+            "score":     score,
+        })
+        grouped = keys.groupby(["month", "subreddit", "type", "label"])["score"].agg(["size", "sum"])
+        for key, (n, total) in zip(grouped.index, grouped.to_numpy()):
+            d = self.deltas[key]
+            d[0] += int(n)
+            d[1] += int(total)
+
+    # ── persisting ───────────────────────────────────────────────────────
+    @property
+    def position(self):
+        row = self.db.execute("SELECT position FROM sources WHERE source = ?", (self.source,)).fetchone()
+        return None if row is None else row[0]
+
+    def commit(self, position):
+        # fold in everything added since the last commit; the cube now
+        # matches `output` up to `position`
+        self.db.executemany(
+            """INSERT INTO cube VALUES (?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(source, month, subreddit, type, label)
+               DO UPDATE SET n = n + excluded.n, score_sum = score_sum + excluded.score_sum""",
+            [(self.source, *key, n, _bind(total)) for key, (n, total) in self.deltas.items()],
+        )
+        self.db.execute("INSERT OR REPLACE INTO sources VALUES (?, ?)", (self.source, position))
+        self.db.commit()
+        self.deltas.clear()
+
+    def reset(self):
+        self.deltas.clear()
+        self.db.execute("DELETE FROM cube WHERE source = ?", (self.source,))
+        self.db.execute("INSERT OR REPLACE INTO sources VALUES (?, 0)", (self.source,))
+        self.db.commit()
+
+    def rebuild(self, **csv_kwargs):
+        # recount the whole output file (csv_kwargs as for load_corpus)
+        self.reset()
+        for df in iter_corpus(self.output, REBUILD_ROWS, dtype=str, **csv_kwargs):
+            self.add_frame(df)
+        self.commit(output_position(self.output))
+
+    def sync(self, position, **csv_kwargs):
+        # called once the output has been cut back to its checkpoint: make
+        # the cube match it, rebuilding only if the two disagree
+        if position == 0:
+            self.reset()
+        elif self.position != position:
+            self.rebuild(**csv_kwargs)
+
+    def close(self):
+        self.db.close()
+
+    # ── reading ──────────────────────────────────────────────────────────
+    def monthly(self, by=None, value="n", **where):
+        # month-indexed totals: n and score_sum, or with by="label" (or
+        # "subreddit"/"type") one `value` column per category. where=
+        # filters, e.g. type="comment"
+        cond = " AND ".join(["source = ?", *(f"{k} = ?" for k in where)])
+        args = [self.source, *where.values()]
+        if by is None:
+            df = pd.read_sql_query(
+                f"SELECT month, SUM(n) AS n, SUM(score_sum) AS score_sum FROM cube "
+                f"WHERE {cond} GROUP BY month ORDER BY month", self.db, params=args)
+            df["month"] = pd.to_datetime(df["month"], format="%Y-%m")
+            return df.set_index("month")
+        df = pd.read_sql_query(
+            f"SELECT month, {by}, SUM({value}) AS v FROM cube "
+            f"WHERE {cond} GROUP BY month, {by}", self.db, params=args)
+        df["month"] = pd.to_datetime(df["month"], format="%Y-%m")
+        return df.pivot(index="month", columns=by, values="v").fillna(0).astype("int64").sort_index()
+
+
+def load_monthly(output, **csv_kwargs):
+    # the cube for `output`, brought up to date first if the file has changed
+    cube = MonthlyCube(output)
+    if cube.position != output_position(output):
+        cube.rebuild(**csv_kwargs)
+    return cube
+
+
+# ── DERIVED SERIES ───────────────────────────────────────────────────────
+def rolling_mean(series, window=3):
+    # centred moving average, as the plots have always drawn it
+    return series.rolling(window, center=True, min_periods=1).mean()
+
+
+def net_sentiment(label_counts):
+    # (pos - neg) / total per month from monthly(by="label")
+    counts = label_counts.reindex(columns=["pos", "neu", "neg"], fill_value=0)
+    return (counts["pos"] - counts["neg"]) / counts.sum(axis=1)
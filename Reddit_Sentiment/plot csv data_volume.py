@@ -1,31 +1,38 @@
-import csv
-
-import pandas as pd
 import matplotlib.pyplot as plt
 
+from monthly_cube import load_monthly, rolling_mean
+
 # ── CONFIGURE ───────────────────────────────────────────────────────────────
-FILEPATH = "RawRedditCount/Economics_debt_deficit_posts.csv"  # path to your CSV file
+FILEPATH = "RawRedditCount/Economics_debt_deficit_posts.csv"  # path to your CSV (or .parquet) file
+
+# True = count a group of duplicate posts (cross-posts, reposts, see
+# dedup.py) once, in the month of its first post, instead of every row
+COUNT_GROUPS = False
+GROUPS_PATH  = "RawRedditCount/Economics_debt_deficit_posts_groups.csv"  # dedup.py's one row per group
 
-# ── 1) LOAD & PARSE ─────────────────────────────────────────────────────────
-df = pd.read_csv(FILEPATH, parse_dates=["created_utc"])
-print(df.iloc[0])
-# ── 2) EXTRACT MONTH ────────────────────────────────────────────────────────
-df["month"] = df["created_utc"].dt.to_period("M").dt.to_timestamp()
+# ── 1) LOAD PRE-AGGREGATED MONTHS ───────────────────────────────────────────
+# counts and score sums per month come from the monthly cube the scrapers
+# keep up to date (built from FILEPATH once if it has changed since)
+cube = load_monthly(FILEPATH)
 
-# ── 3) AGGREGATE BY MONTH ───────────────────────────────────────────────────
-monthly = df.groupby("month").agg(
-    submission_count=("id", "count"),
-    total_score=("score", "sum")
-).reset_index()
+# ── 2) AGGREGATE BY MONTH ───────────────────────────────────────────────────
+monthly = cube.monthly().rename(columns={"n": "submission_count", "score_sum": "total_score"})
+cube.close()
+if COUNT_GROUPS:
+    groups = load_monthly(GROUPS_PATH)
+    monthly["submission_count"] = groups.monthly()["n"].reindex(monthly.index, fill_value=0)
+    groups.close()
+monthly = monthly.reset_index()
+count_label = "Monthly Count (duplicates once)" if COUNT_GROUPS else "Monthly Count"
 
-# ── 4) SMOOTHING (3‐month moving average) ───────────────────────────────────
+# ── 3) SMOOTHING (3‐month moving average) ───────────────────────────────────
 window = 3
-monthly["count_smooth"] = monthly["submission_count"].rolling(window, center=True, min_periods=1).mean()
-monthly["score_smooth"] = monthly["total_score"].rolling(window, center=True, min_periods=1).mean()
+monthly["count_smooth"] = rolling_mean(monthly["submission_count"], window)
+monthly["score_smooth"] = rolling_mean(monthly["total_score"], window)
 
-# ── 5) PLOT MONTHLY SUBMISSION COUNT & SMOOTHED ────────────────────────────
+# ── 4) PLOT MONTHLY SUBMISSION COUNT & SMOOTHED ────────────────────────────
 plt.figure(figsize=(12, 5))
-plt.plot(monthly["month"], monthly["submission_count"], marker="o", linewidth=1.2, alpha=0.6, label="Monthly Count")
+plt.plot(monthly["month"], monthly["submission_count"], marker="o", linewidth=1.2, alpha=0.6, label=count_label)
 plt.plot(monthly["month"], monthly["count_smooth"], color="C2", linewidth=2, label=f"{window}-Month MA")
 plt.title("Monthly Debt Comment Count on Debt Posts with 3-Month Moving Average on r/Politics")
 plt.xlabel("Month")
@@ -35,7 +42,7 @@ plt.grid(alpha=0.3)
 plt.tight_layout()
 plt.show()
 
-# ── 6) PLOT MONTHLY TOTAL SCORE & SMOOTHED ─────────────────────────────────
+# ── 5) PLOT MONTHLY TOTAL SCORE & SMOOTHED ─────────────────────────────────
 plt.figure(figsize=(12, 5))
 plt.plot(monthly["month"], monthly["total_score"], marker="o", linewidth=1.2, alpha=0.6, color="C1", label="Monthly Total Score")
 plt.plot(monthly["month"], monthly["score_smooth"], color="C3", linewidth=2, label=f"{window}-Month MA")
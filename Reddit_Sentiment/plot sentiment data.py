@@ -1,24 +1,20 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 
-# 1) load your sentiment‐annotated file
-df = pd.read_csv(
+from monthly_cube import load_monthly, net_sentiment
+
+# 1) monthly label counts of your sentiment-annotated file, from the monthly
+#    cube Sentiment_Analysis.py keeps up to date (if the file changed since,
+#    it is counted once; a .parquet version has no malformed rows, so the
+#    CSV options don't apply)
+cube = load_monthly(
     "SentimentData/comment_economics_sentiment.csv",
     engine="python",
-    parse_dates=["created_utc"],
     on_bad_lines="skip"     # drop any malformed rows
 )
 
-# 2) extract month
-df["month"] = df["created_utc"].dt.to_period("M").dt.to_timestamp()
-
-# 3) group & count
-sentiment_counts = (
-    df
-    .groupby(["month", "twitter_label"])
-    .size()
-    .unstack(fill_value=0)   # columns: neg, neu, pos
-)
+# 2) + 3) counts per month and label
+sentiment_counts = cube.monthly(by="label")
+cube.close()
 
 # make sure we have the columns in the right order
 for col in ["pos","neu","neg"]:
@@ -45,8 +41,7 @@ plt.tight_layout()
 plt.show()
 
 # 5) compute net sentiment = (Pos - Neg) / Total
-total = sentiment_counts.sum(axis=1)
-net = (sentiment_counts["pos"] - sentiment_counts["neg"]) / total
+net = net_sentiment(sentiment_counts)
 
 # 6) plot net sentiment
 plt.figure(figsize=(12,4))
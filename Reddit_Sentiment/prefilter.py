@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+import re
+
+
+# Cheap test on the raw bytes of a dump line that rejects lines which cannot
+# possibly match, so json.loads only runs on candidates. It only ever errs on
+# the side of letting a line through; the scrapers re-check every candidate
+# with the exact same haystack test as before.
+#
+# Why this is exact: a term like "national debt" can only match the lowered
+# f"{title} {selftext} {body}" haystack if each of its space-free words
+# ("national", "debt") sits inside one decoded field, so each word must also
+# show up in the lowered line once its JSON escapes are undone. Lowering the
+# whole line instead of each field only changes final-sigma handling, so σ/ς
+# are treated as the same letter. Non-string fields (None, numbers, lists are
+# str()-ed into the haystack) send the line through as well.
+
+ESCAPE    = re.compile(r"\\u([dD][89abAB][0-9a-fA-F]{2})\\u([dD][c-fC-F][0-9a-fA-F]{2})"
+                       r"|\\u([0-9a-fA-F]{4})|\\(.)", re.DOTALL)
+SHORT_ESC = {"b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+def _fold(s):
+    return s.lower().replace("ς", "σ")
+
+
+def _unescape(m):
+    hi, lo, cp, ch = m.groups()
+    if hi:
+        return chr(0x10000 + ((int(hi, 16) - 0xD800) << 10) + (int(lo, 16) - 0xDC00))
+    if cp:
+        return chr(int(cp, 16))
+    return SHORT_ESC.get(ch, ch)
+
+
+class Prefilter:
+    def __init__(self, terms, fields=("title", "selftext", "body")):
+        # every term as its list of space-free, case-folded words
+        self.terms = [[_fold(w) for w in t.split(" ") if w] for t in terms]
+        # ASCII-only versions for the bytes fast path (None = can't occur in
+        # a plain ASCII line)
+        self.ascii_terms = [
+            [w.encode("ascii") if w.isascii() else None for w in t]
+            for t in self.terms
+        ]
+        # any haystack field holding a non-string value
+        keys = "|".join(re.escape(f) for f in fields)
+        self.non_string = re.compile(rf'"(?:{keys})"[ \t\n\r]*:[ \t\n\r]*[^" \t\n\r]')
+        self.ascii_non_string = re.compile(self.non_string.pattern.encode("utf-8"))
+
+    def __call__(self, line):
+        # True if `line` (raw bytes) may match, False if it certainly won't
+        if b"\\" not in line and line.isascii():
+            # plain ASCII, no escapes: the raw bytes are the decoded text
+            low = line.lower()
+            for words in self.ascii_terms:
+                for w in words:
+                    if w is None or w not in low:
+                        break
+                else:
+                    return True
+            return self.ascii_non_string.search(line) is not None
+
+        text = line.decode("utf-8", "surrogateescape")
+        if "\\" in text:
+            text = ESCAPE.sub(_unescape, text)
+        low = _fold(text)
+        for words in self.terms:
+            for w in words:
+                if w not in low:
+                    break
+            else:
+                return True
+        return self.non_string.search(text) is not None
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+import os
+import json
+import time
+from datetime import date, timedelta
+from functools import lru_cache
+
+
+# Decoding dump lines into the few fields the scrapers read. A line holds
+# dozens of fields; the fastest available parser is used:
+#   msgspec  decodes straight into a struct of FIELDS, skipping the rest
+#   orjson   full dict, cut down to FIELDS; several times faster than the stdlib
+#   json     the stdlib, always there
+# Whatever a fast parser rejects (NaN, ints beyond 64 bits, lone
+# surrogates, truncated lines, ...) goes through the stdlib path again, so
+# every backend gives the same records and the same errors as
+# json.loads(line.decode("utf-8")). Records are plain dicts with (at least)
+# the FIELDS present in the line, so `"title" in obj` still means what it did.
+# ── CONFIG ───────────────────────────────────────────────────────────────
+# "auto" = msgspec, else orjson, else json; SCAN_JSON=<backend> overrides
+JSON_BACKEND = os.environ.get("SCAN_JSON", "auto")
+FIELDS = ("id", "created_utc", "subreddit", "author", "score", "num_comments",
+          "title", "selftext", "body", "permalink", "url", "link_id")
+
+
+def _stdlib(line):
+    return json.loads(line.decode("utf-8"))
+
+
+def _msgspec_decoder(fields):
+    import msgspec
+    from typing import Any
+    Record = msgspec.defstruct("Record", [(f, Any, msgspec.UNSET) for f in fields])
+    decode, unset = msgspec.json.Decoder(Record).decode, msgspec.UNSET
+
+    def fast(line):
+        rec = decode(line)
+        return {f: v for f in fields if (v := getattr(rec, f)) is not unset}
+    return fast, msgspec.MsgspecError
+
+
+def _orjson_decoder(fields):
+    import orjson
+    loads = orjson.loads
+
+    def fast(line):
+        obj = loads(line)
+        if type(obj) is not dict:
+            return _stdlib(line)
+        rec = {f: obj[f] for f in fields if f in obj}
+        # orjson reads ints beyond 64 bits as floats; floats (and whatever
+        # a list or object might hide) are left to the stdlib
+        for v in rec.values():
+            if isinstance(v, (float, list, dict)):
+                return _stdlib(line)
+        return rec
+    return fast, orjson.JSONDecodeError
+
+
+@lru_cache(maxsize=None)
+def decoder(backend=JSON_BACKEND, fields=FIELDS):
+    # (backend actually used, line -> record)
+    makers = {"msgspec": _msgspec_decoder, "orjson": _orjson_decoder}
+    order  = ["msgspec", "orjson"] if backend == "auto" else [backend]
+    for name in order:
+        if name == "json":
+            break
+        if name not in makers:
+            raise ValueError(f"unknown JSON backend {name!r} (expected auto, msgspec, orjson or json)")
+        try:
+            fast, errors = makers[name](fields)
+        except ImportError:
+            if backend != "auto":
+                raise
+            continue
+
+        def decode(line, fast=fast, errors=errors):
+            try:
+                return fast(line)
+            except errors:
+                return _stdlib(line)
+        return name, decode
+    return "json", _stdlib
+
+
+def decode_lines(lines, counts, backend=JSON_BACKEND):
+    # records of the parseable lines; malformed ones are counted in
+    # counts["bad_json"], time goes to t_decode (UTF-8) / t_parse (JSON)
+    name, decode = decoder(backend)
+    records = []
+    t0 = time.perf_counter()
+    if name == "json":
+        # the stdlib needs str: decoding is a step of its own
+        lines = [line.decode("utf-8") for line in lines]
+        decode = json.loads
+    t1 = time.perf_counter()
+    for line in lines:
+        try:
+            records.append(decode(line))
+        except json.JSONDecodeError:
+            counts["bad_json"] += 1
+    counts.update(t_decode=t1 - t0, t_parse=time.perf_counter() - t1)
+    return records
+
+
+# ── TIMESTAMPS ───────────────────────────────────────────────────────────
+_MM_SS = [f"{m:02d}:{s:02d}" for m in range(60) for s in range(60)]
+
+
+@lru_cache(maxsize=1 << 16)
+def _iso_hour(hour):
+    day, h = divmod(hour, 24)
+    return f"{(date(1970, 1, 1) + timedelta(days=day)).isoformat()}T{h:02d}:"
+
+
+def iso_utc(ts):
+    # datetime.utcfromtimestamp(int(ts)).isoformat() without building a
+    # datetime per row: "YYYY-MM-DDTHH:" is cached per hour (dumps are in
+    # time order, so nearly every row hits), "MM:SS" comes from a table
+    hour, sec = divmod(int(ts), 3600)
+    return _iso_hour(hour) + _MM_SS[sec]
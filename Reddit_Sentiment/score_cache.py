@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+import hashlib
+import sqlite3
+import unicodedata
+
+import numpy as np
+
+
+# On-disk cache of sentiment scores, keyed by a hash of the normalized text
+# plus the scorer's cache_key (model name + truncation settings), so
+# reposted titles, "[removed]"/bot boilerplate and rows already scored on an
+# earlier run never reach the model again. All three class probabilities
+# are kept, not just the label. When it grows past max_entries the least
+# recently used entries are dropped.
+# ── CONFIG ───────────────────────────────────────────────────────────────
+CACHE_PATH  = "sentiment_cache.sqlite"
+MAX_ENTRIES = 2_000_000       # ~100 bytes each on disk
+LOOKUP_SIZE = 500             # keys per SELECT ... IN (...)
+
+
+def normalize(text):
+    # what the cache key is built from: NFC, whitespace runs collapsed, stripped
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class ScoreCache:
+    def __init__(self, path=CACHE_PATH, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""CREATE TABLE IF NOT EXISTS scores (
+                               key  BLOB PRIMARY KEY,
+                               neg  REAL, neu REAL, pos REAL,
+                               used INTEGER)
+                           WITHOUT ROWID""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS scores_used ON scores(used)")
+        self.size, clock = self.db.execute("SELECT COUNT(*), MAX(used) FROM scores").fetchone()
+        self.clock   = (clock or 0) + 1      # one tick per lookup batch, for LRU
+        self.hits    = 0
+        self.misses  = 0
+        self.evicted = 0
+
+    @staticmethod
+    def key(text, model_key):
+        data = f"{model_key}\0{text}".encode("utf-8", "surrogatepass")
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+    def get_many(self, keys):
+        # {key: (neg, neu, pos)} for the keys already cached
+        found = {}
+        for start in range(0, len(keys), LOOKUP_SIZE):
+            part = keys[start:start + LOOKUP_SIZE]
+            rows = self.db.execute(
+                f"SELECT key, neg, neu, pos FROM scores WHERE key IN ({','.join('?' * len(part))})",
+                part,
+            )
+            found.update((k, (n, u, p)) for k, n, u, p in rows)
+        if found:
+            self.db.executemany("UPDATE scores SET used = ? WHERE key = ?",
+                                [(self.clock, k) for k in found])
+            self.db.commit()
+        return found
+
+    def put_many(self, keys, probs):
+        self.db.executemany(
+            "INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?, ?)",
+            [(k, float(p[0]), float(p[1]), float(p[2]), self.clock) for k, p in zip(keys, probs)],
+        )
+        self.size += len(keys)
+        if self.size > self.max_entries:
+            # drop the least recently used 10% below the limit in one go
+            drop = self.size - int(self.max_entries * 0.9)
+            self.db.execute("DELETE FROM scores WHERE key IN "
+                            "(SELECT key FROM scores ORDER BY used LIMIT ?)", (drop,))
+            self.size    -= drop
+            self.evicted += drop
+        self.db.commit()
+        self.clock += 1
+
+    def stats(self):
+        total = self.hits + self.misses
+        rate  = self.hits / total if total else 0.0
+        return (f"cache: {self.hits:,} hits, {self.misses:,} misses ({rate:.1%} hit rate), "
+                f"{self.size:,} entries, {self.evicted:,} evicted")
+
+    def close(self):
+        self.db.close()
+
+
+class CachedScorer:
+    # same probabilities() interface as the scorer it wraps; only texts
+    # that are neither cached nor repeated within the call get scored
+    def __init__(self, scorer, cache):
+        self.scorer = scorer
+        self.cache  = cache
+
+    def probabilities(self, texts, progress=True):
+        # normalize() only builds the key: the model gets the text as given
+        # (that of the first occurrence), exactly as without the cache
+        texts = list(texts)
+        keys  = [self.cache.key(normalize(t), self.scorer.cache_key) for t in texts]
+
+        unique = list(dict.fromkeys(keys))
+        scores = self.cache.get_many(unique)
+        todo   = [k for k in unique if k not in scores]
+        if todo:
+            first = {}
+            for k, t in zip(keys, texts):
+                first.setdefault(k, t)
+            probs = self.scorer.probabilities([first[k] for k in todo], progress)
+            self.cache.put_many(todo, probs)
+            scores.update(zip(todo, map(tuple, probs)))
+
+        self.cache.misses += len(todo)
+        self.cache.hits   += len(keys) - len(todo)
+        return np.array([scores[k] for k in keys], dtype=np.float32).reshape(len(keys), 3)
@@ -1,82 +1,157 @@
 #!/usr/bin/env python3
-import io
-import json
 import csv
-from datetime import datetime
-import zstandard as zstd
+import time
+import argparse
+from collections import Counter
+from functools import partial
+
+from dumpscan import ResumableScan, split_lines, map_chunks, PROGRESS_SECONDS
+from monthly_cube import MonthlyCube
+from prefilter import Prefilter
+from record_decoder import decode_lines, iso_utc
 
 
 # This is to get the comments or the posts that have "naitonal debt" or "national deficit" in them
 # ── CONFIG ───────────────────────────────────────────────────────────────
 INPUT_ZST   = "Economics_comments.zst"   # path to your .zst file (Not public; I am not putting 26 GB on Github)
-OUTPUT_CSV  = "Economics_debt_deficit_comments.csv"        # your output CSV
+OUTPUT_CSV  = "RawRedditCount/Economics_debt_deficit_comments.csv"        # your output CSV
 
 # terms to search for (case‐insensitive substring match)
 TERMS = ["national debt", "national deficit"]
 
+# raw-byte fast path: lines that certainly don't mention any TERMS are
+# dropped before JSON parsing (candidates still go through the exact test)
+PREFILTER = Prefilter(TERMS)
+
 # how many characters of text context to keep (None = whole field)
 MAX_TEXT_LEN = 500
 
+# worker processes for decoding/parsing/matching (1 = scan in this process)
+WORKERS = 1
+
+HEADER = [
+    "id", "created_utc", "subreddit", "author",
+    "score", "num_comments",
+    "type",   # "submission" or "comment"
+    "title",  # submissions only
+    "text",   # selftext or comment body
+    "permalink"
+]
+
+# ── MATCH ONE RECORD ─────────────────────────────────────────────────────
+def haystack(obj):
+    # one long string to search
+    return f"{obj.get('title', '')} {obj.get('selftext', '')} {obj.get('body', '')}".lower()
+
+
+def filter_record(obj, epoch=False):
+    # epoch=True keeps created_utc as int seconds (for Parquet output)
+    title    = obj.get("title", "")
+    selftext = obj.get("selftext", "")    # submissions
+    body     = obj.get("body", "")        # comments
+    if not any(term in haystack(obj) for term in TERMS):
+        return None
+
+    # determine if submission or comment
+    is_sub = "selftext" in obj and "title" in obj
+    post_type = "submission" if is_sub else "comment"
+
+    # extract a reasonable snippet
+    text_field = selftext if is_sub else body
+    snippet    = (text_field[:MAX_TEXT_LEN] + "...") if MAX_TEXT_LEN and len(text_field)>MAX_TEXT_LEN else text_field
+
+    # permalink: either /r/.../comments/... or comment permalink
+    permalink = obj.get("permalink") or obj.get("url","")
+
+    created = int(obj["created_utc"])
+    return [
+        obj.get("id",""),
+        created if epoch else iso_utc(created),
+        obj.get("subreddit",""),
+        obj.get("author",""),
+        obj.get("score",0),
+        obj.get("num_comments",0),
+        post_type,
+        title if is_sub else "",
+        snippet,
+        permalink
+    ]
+
+# runs in the worker processes: one chunk of whole lines -> matching rows.
+# Each step runs over the whole chunk at once, so timing it costs two clock
+# reads per chunk rather than per line
+def filter_chunk(chunk, epoch=False):
+    rows   = []
+    counts = Counter()
+    clock  = time.perf_counter
+
+    t0 = clock()
+    lines      = split_lines(chunk)
+    candidates = [line for line in lines if PREFILTER(line)]
+    t1 = clock()
+    objs = decode_lines(candidates, counts)
+    t2 = clock()
+    for obj in objs:
+        row = filter_record(obj, epoch)
+        if row is not None:
+            rows.append(row)
+            counts[f"subreddit:{row[2]}"] += 1
+            hay = haystack(obj)
+            counts.update(f"term:{term}" for term in TERMS if term in hay)
+    t3 = clock()
+
+    counts.update(lines=len(lines), rejected=len(lines) - len(candidates),
+                  parsed=len(candidates), matched=len(rows),
+                  t_prefilter=t1 - t0, t_match=t3 - t2)
+    return rows, counts
+
 # ── STREAM & FILTER ──────────────────────────────────────────────────────
-def stream_and_filter(input_zst, output_csv):
-    # open output CSV
-    with open(output_csv, "w", newline="", encoding="utf-8") as outf:
-        writer = csv.writer(outf)
+def stream_and_filter(input_zst, output_csv, workers=WORKERS, resume=False, progress=PROGRESS_SECONDS):
+    # input_zst may also be a list of dumps (e.g. monthly files), all
+    # filtered into the one output; an output named *.parquet is written as
+    # a typed Parquet dataset instead of CSV
+    # the monthly counts for the plots are kept up to date as rows are written;
+    # progress is printed every `progress` seconds (0 = never), the full
+    # breakdown goes to <output_csv>.stats.json
+    cube    = MonthlyCube(output_csv, HEADER)
+    scan    = ResumableScan(input_zst, output_csv, resume, aggregate=cube, progress=progress)
+    parquet = output_csv.endswith(".parquet")
+
+    # open output CSV (cut back to the checkpoint when resuming)
+    with scan.open(HEADER, newline="", encoding="utf-8") as outf:
+        writer = outf if parquet else csv.writer(outf)
         # header row
-        writer.writerow([
-            "id", "created_utc", "subreddit", "author",
-            "score", "num_comments",
-            "type",   # "submission" or "comment"
-            "title",  # submissions only
-            "text",   # selftext or comment body
-            "permalink"
-        ])
-
-        # set up Zstd decompressor + text wrapper
-        with open(input_zst, "rb") as ifh:
-            dctx   = zstd.ZstdDecompressor(max_window_size=2**31)
-            reader = dctx.stream_reader(ifh)
-            text_f = io.TextIOWrapper(reader, encoding="utf-8")
-
-            for line in text_f:
-                try:
-                    obj = json.loads(line)
-                except json.JSONDecodeError:
-                    continue
-
-                # build one long string to search
-                title    = obj.get("title", "")
-                selftext = obj.get("selftext", "")    # submissions
-                body     = obj.get("body", "")        # comments
-                haystack = f"{title} {selftext} {body}".lower()
-
-                if any(term in haystack for term in TERMS):
-                    # determine if submission or comment
-                    is_sub = "selftext" in obj and "title" in obj
-                    post_type = "submission" if is_sub else "comment"
-
-                    # extract a reasonable snippet
-                    text_field = selftext if is_sub else body
-                    snippet    = (text_field[:MAX_TEXT_LEN] + "...") if MAX_TEXT_LEN and len(text_field)>MAX_TEXT_LEN else text_field
-
-                    # permalink: either /r/.../comments/... or comment permalink
-                    permalink = obj.get("permalink") or obj.get("url","")
-
-                    # write row
-                    writer.writerow([
-                        obj.get("id",""),
-                        datetime.utcfromtimestamp(int(obj["created_utc"])).isoformat(),
-                        obj.get("subreddit",""),
-                        obj.get("author",""),
-                        obj.get("score",0),
-                        obj.get("num_comments",0),
-                        post_type,
-                        title if is_sub else "",
-                        snippet,
-                        permalink
-                    ])
+        if scan.fresh and not parquet:
+            writer.writerow(HEADER)
+
+        def write(rows):
+            writer.writerows(rows)
+            cube.add_rows(rows)
+
+        # decompress in line-aligned chunks; parse & match them in `workers`
+        # processes, writing the rows back in the original order
+        results = map_chunks(partial(filter_chunk, epoch=parquet), scan.chunks(), workers)
+        scan.write_all(outf, results, write)
+    cube.close()
 
+    totals = scan.counts
     print(f"Done—filtered rows written to {output_csv}")
+    print(f"{totals['lines']:,} lines: {totals['rejected']:,} pre-rejected on raw bytes, "
+          f"{totals['parsed']:,} fully parsed, {totals['bad_json']:,} bad JSON skipped")
 
 if __name__ == "__main__":
-    stream_and_filter(INPUT_ZST, OUTPUT_CSV)
+    parser = argparse.ArgumentParser(description="Filter a Reddit .zst dump for TERMS")
+    parser.add_argument("--input", default=INPUT_ZST, help="dump to filter (default %(default)s)")
+    parser.add_argument("--output", default=OUTPUT_CSV, help="output CSV (default %(default)s)")
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help="worker processes (default %(default)s)")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue from the output's checkpoint; also picks up only "
+                             "the data appended to the dump since the last run")
+    parser.add_argument("--parquet", action="store_true",
+                        help="write the output as a .parquet dataset instead")
+    parser.add_argument("--progress", type=float, default=PROGRESS_SECONDS,
+                        help="seconds between progress lines, 0 = none (default %(default)s)")
+    args = parser.parse_args()
+    output = args.output.replace(".csv", ".parquet") if args.parquet else args.output
+    stream_and_filter(args.input, output, args.workers, args.resume, args.progress)
@@ -1,75 +1,244 @@
 #!/usr/bin/env python3
-import io
-import json
+import os
+import re
 import csv
-from pathlib import Path
-import zstandard as zstd
-from datetime import datetime
+import time
+import argparse
+from collections import Counter
+from functools import partial
+
+from dumpscan import ResumableScan, split_lines, map_chunks, PROGRESS_SECONDS
+from idset import IdSet
+from monthly_cube import MonthlyCube
+from prefilter import Prefilter
+from record_decoder import decode_lines, iso_utc
+from thread_index import ThreadIndex, CsvRows
 
 
 # This is to get the comments of the posts that have "naitonal debt" or "national deficit" in them
 # ── CONFIG ───────────────────────────────────────────────────────────────
-SUB_ZST    = "Economics_submissions.zst"    # your raw submissions dump
-CMT_ZST    = "Economics_comments.zst"       # your raw comments dump
-OUT_IDS    = "economics_submission_ids.txt"
-OUT_CMTS   = "filtered_economics_comments.csv"
+# every subreddit's raw dumps, all scanned in one run: each submissions dump
+# is read once, then each comments dump once against the matching ids.
+# Without NAME arguments, subreddits whose dumps aren't here are skipped
+DUMPS = {
+    # name:       (submissions dump,            comments dump)
+    "economics": ("Economics_submissions.zst", "Economics_comments.zst"),
+    "politics":  ("politics_submissions.zst",  "politics_comments.zst"),
+}
+OUT_IDS    = "{name}_submission_ids.txt"
+OUT_CMTS   = "filtered_{name}_comments.csv"
 
 KEYWORDS   = ["national debt", "national deficit"]
 
+# worker processes for decoding/parsing/matching (1 = scan in this process)
+WORKERS    = 1
+
+# raw-byte fast paths in front of JSON parsing: submissions that can't mention
+# KEYWORDS, and comments whose link_id can't be one of the kept submissions
+PREFILTER  = Prefilter(KEYWORDS, fields=("title", "selftext"))
+LINK_ID    = re.compile(rb'"link_id"\s*:\s*"([^"\\]*)"')
+# a key spelled with \u escapes; the only kind that could decode to "link_id"
+ESCAPED_KEY = re.compile(rb'"[a-z_]*\\u[0-9a-fA-F]{4}(?:[a-z_]|\\u[0-9a-fA-F]{4})*"\s*:')
+
+
+def report(name, counts):
+    print(f"{name}: {counts['lines']:,} lines, {counts['rejected']:,} pre-rejected "
+          f"on raw bytes, {counts['parsed']:,} fully parsed, {counts['bad_json']:,} bad JSON skipped")
+
+
+def may_be_kept(line, keep_ids):
+    # False only if the raw line certainly has a link_id outside keep_ids;
+    # an escaped link_id key or value falls back to a full parse (\u in
+    # the comment text alone doesn't)
+    if b"\\u" in line and ESCAPED_KEY.search(line):
+        return True
+    values = LINK_ID.findall(line)
+    if len(values) != line.count(b'"link_id"'):
+        return True
+    if not values:
+        return "" in keep_ids
+    return any(v.decode("utf-8").split("_", 1)[-1] in keep_ids for v in values)
+
+
 # ── 1) EXTRACT matching submission IDs ────────────────────────────────────
-subs_stream = Path(SUB_ZST).open("rb")
-subs_reader = zstd.ZstdDecompressor(max_window_size=2**31).stream_reader(subs_stream)
-with open(OUT_IDS, "w", encoding="utf-8") as f_ids:
-    for line in io.TextIOWrapper(subs_reader, encoding="utf-8"):
-        try:
-            obj = json.loads(line)
-        except json.JSONDecodeError:
-            continue
+def submission_chunk(chunk):
+    # each step over the whole chunk at once, timed per chunk (see scrape.py)
+    ids    = []
+    counts = Counter()
+    clock  = time.perf_counter
+
+    t0 = clock()
+    lines      = split_lines(chunk)
+    candidates = [line for line in lines if PREFILTER(line)]
+    t1 = clock()
+    objs = decode_lines(candidates, counts)
+    t2 = clock()
+    for obj in objs:
         title = obj.get("title", "") or ""
         selftext = obj.get("selftext", "") or ""
         text = f"{title} {selftext}".lower()
         if any(k in text for k in KEYWORDS):
-            f_ids.write(obj["id"] + "\n")
-subs_stream.close()
+            ids.append(obj["id"])
+            counts[f"subreddit:{obj.get('subreddit', '')}"] += 1
+            counts.update(f"term:{k}" for k in KEYWORDS if k in text)
+    t3 = clock()
+
+    counts.update(lines=len(lines), rejected=len(lines) - len(candidates),
+                  parsed=len(candidates), matched=len(ids),
+                  t_prefilter=t1 - t0, t_match=t3 - t2)
+    return ids, counts
+
+
+def extract_submission_ids(sub_zst, out_ids, keep_ids, workers=WORKERS, resume=False,
+                           progress=PROGRESS_SECONDS):
+    # adds the matches to keep_ids; the .txt records them so a resumed run
+    # can pick up the ids found before the checkpoint
+    scan = ResumableScan(sub_zst, out_ids, resume, progress=progress)
+    with scan.open(encoding="utf-8") as f_ids:
+        if not scan.fresh:
+            with open(out_ids, "r", encoding="utf-8") as f:
+                keep_ids.update(line.rstrip("\n") for line in f)
+
+        def write(ids):
+            f_ids.writelines(i + "\n" for i in ids)
+            keep_ids.update(ids)
+
+        results = map_chunks(submission_chunk, scan.chunks(), workers)
+        scan.write_all(f_ids, results, write)
+    report(sub_zst, scan.counts)
 
-# load IDs into a set for fast lookups
-with open(OUT_IDS, "r", encoding="utf-8") as f:
-    keep_ids = set(line.strip() for line in f)
 
 # ── 2) FILTER comments & WRITE CSV ────────────────────────────────────────
-cmts_stream = Path(CMT_ZST).open("rb")
-cmts_reader = zstd.ZstdDecompressor(max_window_size=2**31).stream_reader(cmts_stream)
-with open(OUT_CMTS, "w", newline="", encoding="utf-8") as f_out:
-    writer = csv.writer(f_out, quoting=csv.QUOTE_MINIMAL)
-    # write header
-    writer.writerow([
-        "id","created_utc","subreddit","author",
-        "score","num_comments","type","text","permalink"
-    ])
-    # iterate comments
-    for line in io.TextIOWrapper(cmts_reader, encoding="utf-8"):
-        try:
-            obj = json.loads(line)
-        except json.JSONDecodeError:
-            continue
+KEEP_IDS = IdSet()
+
+def set_keep_ids(keep_ids):
+    global KEEP_IDS
+    KEEP_IDS = keep_ids
+
+
+def comment_chunk(chunk, epoch=False):
+    # epoch=True keeps created_utc as int seconds (for Parquet output)
+    rows   = []
+    counts = Counter()
+    clock  = time.perf_counter
+
+    t0 = clock()
+    lines      = split_lines(chunk)
+    candidates = [line for line in lines if may_be_kept(line, KEEP_IDS)]
+    t1 = clock()
+    objs = decode_lines(candidates, counts)
+    t2 = clock()
+    for obj in objs:
         # check if parent submission matches
         parent = obj.get("link_id","").split("_",1)[-1]
-        if parent not in keep_ids:
+        if parent not in KEEP_IDS:
             continue
         # extract fields
         cid          = obj.get("id", "")
         created_ts   = int(obj.get("created_utc", 0))
-        created_iso  = datetime.utcfromtimestamp(created_ts).isoformat()
+        created      = created_ts if epoch else iso_utc(created_ts)
         subreddit    = obj.get("subreddit", "")
         author       = obj.get("author", "")
         score        = obj.get("score", 0)
         num_comments = obj.get("num_comments", 0)
         text         = obj.get("body", "").replace("\n", " ")
         permalink    = obj.get("permalink", "")
-        # write row
-        writer.writerow([
-            cid, created_iso, subreddit, author,
-            score, num_comments, "comment", text, permalink
+        rows.append([
+            cid, created, subreddit, author,
+            score, num_comments, "comment", text, permalink, parent
         ])
-cmts_stream.close()
+        counts[f"subreddit:{subreddit}"] += 1
+    t3 = clock()
+
+    counts.update(lines=len(lines), rejected=len(lines) - len(candidates),
+                  parsed=len(candidates), matched=len(rows),
+                  t_prefilter=t1 - t0, t_match=t3 - t2)
+    return rows, counts
+
+
+CMT_HEADER = [
+    "id","created_utc","subreddit","author",
+    "score","num_comments","type","text","permalink",
+    "link_id"   # parent submission id, without "t3_"
+]
+
+def filter_comments(cmt_zst, keep_ids, out_cmts, workers=WORKERS, resume=False,
+                    progress=PROGRESS_SECONDS):
+    # out_cmts named *.parquet is written as a typed Parquet dataset; a CSV
+    # gets a per-thread index (<out_cmts>.threads.sqlite, see thread_index.py)
+    parquet = out_cmts.endswith(".parquet")
+    cube    = MonthlyCube(out_cmts, CMT_HEADER)
+    threads = None if parquet else ThreadIndex(out_cmts, CMT_HEADER)
+    scan    = ResumableScan(cmt_zst, out_cmts, resume, progress=progress,
+                            aggregate=[a for a in (cube, threads) if a is not None])
+    with scan.open(CMT_HEADER, newline="", encoding="utf-8") as f_out:
+        if parquet:
+            writer = f_out
+        else:
+            # the header goes in before the row offsets are counted
+            if scan.fresh:
+                csv.writer(f_out, quoting=csv.QUOTE_MINIMAL).writerow(CMT_HEADER)
+            writer = CsvRows(f_out, f_out.tell(), quoting=csv.QUOTE_MINIMAL)
+
+        def write(rows):
+            offsets = writer.writerows(rows)
+            cube.add_rows(rows)
+            if threads is not None:
+                threads.add_rows(rows, offsets)
+
+        results = map_chunks(partial(comment_chunk, epoch=parquet), scan.chunks(), workers,
+                             initializer=set_keep_ids, initargs=(keep_ids,))
+        scan.write_all(f_out, results, write)
+    cube.close()
+    if threads is not None:
+        threads.close()
+    report(cmt_zst, scan.counts)
+
+
+# ── 3) ALL DUMPS IN ONE RUN ───────────────────────────────────────────────
+def run(dumps=DUMPS, workers=WORKERS, resume=False, out_cmts=OUT_CMTS, progress=PROGRESS_SECONDS):
+    # comments may only be joined once every submissions dump is in keep_ids.
+    # With resume=True each output continues from its own checkpoint, and
+    # dumps that grew since the last run only have their new data scanned.
+    # Every output gets a <output>.stats.json with counts and a time breakdown.
+    keep_ids = IdSet()
+    for name, (sub_zst, _) in dumps.items():
+        extract_submission_ids(sub_zst, OUT_IDS.format(name=name), keep_ids, workers, resume, progress)
+    print(f"{len(keep_ids):,} matching submissions")
+    for name, (_, cmt_zst) in dumps.items():
+        filter_comments(cmt_zst, keep_ids, out_cmts.format(name=name), workers, resume, progress)
+
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Collect comments on KEYWORDS submissions")
+    parser.add_argument("names", nargs="*", metavar="NAME",
+                        help=f"only these DUMPS ({', '.join(DUMPS)}); default all that are present. Comments only "
+                             f"ever point at submissions of their own subreddit, so subreddits "
+                             f"can be scanned separately (and concurrently)")
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help="worker processes (default %(default)s)")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue every output from its checkpoint; also picks up "
+                             "only the data appended to the dumps since the last run")
+    parser.add_argument("--parquet", action="store_true",
+                        help="write the comment outputs as .parquet datasets instead")
+    parser.add_argument("--progress", type=float, default=PROGRESS_SECONDS,
+                        help="seconds between progress lines, 0 = none (default %(default)s)")
+    args = parser.parse_args()
+    unknown = set(args.names) - set(DUMPS)
+    if unknown:
+        parser.error(f"unknown dump(s): {', '.join(sorted(unknown))}")
+    if args.names:
+        dumps = {name: DUMPS[name] for name in args.names}
+    else:
+        dumps = {}
+        for name, pair in DUMPS.items():
+            absent = [p for p in pair if not os.path.exists(p)]
+            if absent:
+                print(f"skipping {name}: no {', '.join(absent)}")
+            else:
+                dumps[name] = pair
+        if not dumps:
+            parser.error(f"none of the DUMPS are here ({', '.join(p for pair in DUMPS.values() for p in pair)})")
+    out_cmts = OUT_CMTS.replace(".csv", ".parquet") if args.parquet else OUT_CMTS
+    run(dumps, workers=args.workers, resume=args.resume, out_cmts=out_cmts, progress=args.progress)
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+import os
+import json
+import argparse
+
+import numpy as np
+import torch
+from tqdm.auto import tqdm
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+
+# Batched Twitter-RoBERTa scoring for Sentiment_Analysis.py. Texts are
+# tokenized once (truncated to MAX_TOKENS tokens, not characters), sorted by
+# token length so each batch holds similar lengths, padded only to the
+# longest text in its batch, and the results put back in input order.
+#
+# BACKEND = "onnx" runs the same model through ONNX Runtime instead, from a
+# local artifact made once with `python sentiment_model.py --export`
+# (fp32 graph + dynamic int8 quantized copy + tokenizer files). Loading it
+# needs nothing but that directory, so it works fully offline.
+# `python sentiment_model.py --check sample_for_labeling.csv` reports how
+# often the ONNX labels agree with the fp32 PyTorch model.
+# ── CONFIG ───────────────────────────────────────────────────────────────
+MODEL_NAME = "cardiffnlp/twitter-roberta-base-sentiment"
+DEVICE     = "cpu"     # or "cuda" / "cuda:0" on a GPU box
+BATCH_SIZE = 32
+MAX_TOKENS = 512       # RoBERTa's limit, special tokens included
+
+BACKEND          = "torch"                  # "torch" or "onnx"
+ONNX_DIR         = "twitter-roberta-onnx"   # exported artifact
+QUANTIZED        = True                     # int8 graph (False = fp32 graph)
+INTRA_OP_THREADS = 0                        # 0 = ONNX Runtime picks
+INTER_OP_THREADS = 0
+CHECK_SAMPLE     = "sample_for_labeling.csv"
+
+# labels: 'LABEL_0' = negative, 'LABEL_1' = neutral, 'LABEL_2' = positive
+LABELS = ["neg", "neu", "pos"]
+
+
+class RobertaScorer:
+    def __init__(self, model_name=MODEL_NAME, device=DEVICE,
+                 batch_size=BATCH_SIZE, max_tokens=MAX_TOKENS):
+        self.name       = model_name
+        self.device     = torch.device(device)
+        self.batch_size = batch_size
+        self.max_tokens = max_tokens
+        # what a cached score depends on (see score_cache.py)
+        self.cache_key  = f"{model_name}|max_tokens={max_tokens}"
+        self.tokenizer  = AutoTokenizer.from_pretrained(model_name)
+        self.model      = AutoModelForSequenceClassification.from_pretrained(model_name)
+        self.model.to(self.device).eval()
+
+    def batches(self, texts):
+        # (row indices, padded encoding) per batch, shortest texts first
+        enc   = self.tokenizer(list(texts), truncation=True, max_length=self.max_tokens)
+        order = np.argsort([len(ids) for ids in enc["input_ids"]], kind="stable")
+        for start in range(0, len(order), self.batch_size):
+            idx   = order[start:start + self.batch_size]
+            batch = self.tokenizer.pad(
+                {"input_ids": [enc["input_ids"][i] for i in idx],
+                 "attention_mask": [enc["attention_mask"][i] for i in idx]},
+                return_tensors="np",
+            )
+            yield idx, batch
+
+    def probabilities(self, texts, progress=True):
+        # (n, 3) softmax scores in LABELS order, rows in input order
+        texts = list(texts)
+        out   = np.zeros((len(texts), len(LABELS)), dtype=np.float32)
+        total = -(-len(texts) // self.batch_size)
+        with torch.inference_mode():
+            for idx, batch in tqdm(self.batches(texts), total=total,
+                                   desc="Twitter-RoBERTa", disable=not progress):
+                inputs = {k: torch.from_numpy(v).to(self.device) for k, v in batch.items()}
+                logits = self.model(**inputs).logits
+                out[idx] = torch.softmax(logits, dim=-1).float().cpu().numpy()
+        return out
+
+
+class OnnxScorer(RobertaScorer):
+    # same batching and probabilities() as RobertaScorer, but the forward
+    # pass runs in an ONNX Runtime CPU session loaded from `onnx_dir`
+    def __init__(self, onnx_dir=ONNX_DIR, quantized=QUANTIZED,
+                 batch_size=BATCH_SIZE, max_tokens=MAX_TOKENS,
+                 intra_op_threads=INTRA_OP_THREADS, inter_op_threads=INTER_OP_THREADS):
+        import onnxruntime as ort
+        with open(os.path.join(onnx_dir, "export.json")) as f:
+            meta = json.load(f)
+        graph = "model.int8.onnx" if quantized else "model.onnx"
+        self.name       = f"{meta['model_name']} ({graph})"
+        self.batch_size = batch_size
+        self.max_tokens = max_tokens
+        self.cache_key  = f"{meta['model_name']}|onnx:{graph}|max_tokens={max_tokens}"
+        self.tokenizer  = AutoTokenizer.from_pretrained(onnx_dir)
+
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = intra_op_threads
+        opts.inter_op_num_threads = inter_op_threads
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(os.path.join(onnx_dir, graph), opts,
+                                            providers=["CPUExecutionProvider"])
+
+    def probabilities(self, texts, progress=True):
+        texts = list(texts)
+        out   = np.zeros((len(texts), len(LABELS)), dtype=np.float32)
+        total = -(-len(texts) // self.batch_size)
+        for idx, batch in tqdm(self.batches(texts), total=total,
+                               desc="Twitter-RoBERTa (onnx)", disable=not progress):
+            feed = {k: batch[k].astype(np.int64) for k in ("input_ids", "attention_mask")}
+            logits = self.session.run(["logits"], feed)[0]
+            logits = logits - logits.max(axis=1, keepdims=True)
+            e = np.exp(logits)
+            out[idx] = e / e.sum(axis=1, keepdims=True)
+        return out
+
+
+def make_scorer(backend=BACKEND, model_name=MODEL_NAME, device=DEVICE,
+                batch_size=BATCH_SIZE, max_tokens=MAX_TOKENS, **onnx_kwargs):
+    if backend == "torch":
+        return RobertaScorer(model_name, device=device,
+                             batch_size=batch_size, max_tokens=max_tokens)
+    if backend == "onnx":
+        return OnnxScorer(batch_size=batch_size, max_tokens=max_tokens, **onnx_kwargs)
+    raise ValueError(f"unknown sentiment backend {backend!r} (expected 'torch' or 'onnx')")
+
+
+def labels_from(probs):
+    # argmax of each row as "neg"/"neu"/"pos"
+    return np.array(LABELS, dtype=object)[np.argmax(probs, axis=1)]
+
+
+# ── EXPORT / AGREEMENT CHECK ─────────────────────────────────────────────
+def export_onnx(model_name=MODEL_NAME, onnx_dir=ONNX_DIR):
+    # one-off: fp32 ONNX graph with dynamic batch/sequence axes, a dynamically
+    # int8-quantized copy of it, and the tokenizer files next to them
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    os.makedirs(onnx_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model     = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+    tokenizer.save_pretrained(onnx_dir)
+
+    sample = tokenizer(["national debt", "the deficit is growing"],
+                       padding=True, return_tensors="pt")
+    fp32 = os.path.join(onnx_dir, "model.onnx")
+    axes = {0: "batch", 1: "tokens"}
+    torch.onnx.export(
+        model,
+        (sample["input_ids"], sample["attention_mask"]),
+        fp32,
+        input_names=["input_ids", "attention_mask"],
+        output_names=["logits"],
+        dynamic_axes={"input_ids": axes, "attention_mask": axes, "logits": {0: "batch"}},
+        opset_version=17,
+        dynamo=False,
+    )
+    quantize_dynamic(fp32, os.path.join(onnx_dir, "model.int8.onnx"),
+                     weight_type=QuantType.QInt8)
+    with open(os.path.join(onnx_dir, "export.json"), "w") as f:
+        json.dump({"model_name": model_name, "torch": torch.__version__}, f, indent=2)
+    print(f"Exported {model_name} to '{onnx_dir}'")
+
+
+def agreement(reference, candidate, texts):
+    # label agreement rate and worst per-class probability gap, candidate vs reference
+    ref = reference.probabilities(texts)
+    got = candidate.probabilities(texts)
+    same = np.argmax(ref, axis=1) == np.argmax(got, axis=1)
+    return {
+        "texts":     len(texts),
+        "agreement": float(same.mean()) if len(texts) else 1.0,
+        "disagree":  int((~same).sum()),
+        "max_diff":  float(np.abs(ref - got).max()) if len(texts) else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    import pandas as pd
+    ap = argparse.ArgumentParser(description="Export / check the ONNX sentiment backend.")
+    ap.add_argument("--model", default=MODEL_NAME)
+    ap.add_argument("--onnx-dir", default=ONNX_DIR)
+    ap.add_argument("--export", action="store_true", help="export MODEL to ONNX_DIR")
+    ap.add_argument("--check", nargs="?", const=CHECK_SAMPLE, metavar="CSV",
+                    help="compare the ONNX backend with fp32 PyTorch on CSV's `text` column")
+    ap.add_argument("--fp32", action="store_true", help="check the fp32 graph, not int8")
+    ap.add_argument("--threads", type=int, default=INTRA_OP_THREADS)
+    args = ap.parse_args()
+
+    if args.export:
+        export_onnx(args.model, args.onnx_dir)
+    if args.check:
+        texts = pd.read_csv(args.check)["text"].fillna("").astype(str).tolist()
+        res = agreement(RobertaScorer(args.model),
+                        OnnxScorer(args.onnx_dir, quantized=not args.fp32,
+                                   intra_op_threads=args.threads),
+                        texts)
+        print(f"{res['texts']} texts: {res['agreement']:.2%} label agreement "
+              f"({res['disagree']} differ), max probability deviation {res['max_diff']:.4f}")
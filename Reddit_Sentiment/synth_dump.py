@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+import os
+import json
+import random
+import argparse
+
+import zstandard as zstd
+
+
+# Synthetic Pushshift-shaped dumps (zstd-compressed NDJSON, one object per
+# line) for benchmarking the scanners without the real multi-GB files.
+# Records carry the fields the scrapers read plus the usual Pushshift
+# filler, so lines are realistically long and mostly irrelevant. Knobs:
+#   size          decompressed MB per dump
+#   match_rate    share of records mentioning one of TERMS
+#   near_miss     share mentioning "national" and "debt" apart (they get
+#                 past the byte prefilter but fail the exact test)
+#   comment_share comments vs submissions in the mixed dump (scrape.py)
+#   malformed     share of truncated, unparseable lines
+#   long_rate     share of bodies LONG_CHARS long
+# Same seed and knobs -> byte-identical dumps.
+# ── CONFIG ───────────────────────────────────────────────────────────────
+SIZE_MB       = 64
+MATCH_RATE    = 0.01
+NEAR_MISS     = 0.02
+COMMENT_SHARE = 0.8
+MALFORMED     = 0.001
+LONG_RATE     = 0.005
+LONG_CHARS    = 40_000
+THREAD_MATCH  = 0.05        # share of comments replying to a matching submission
+SEED          = 1
+LEVEL         = 3           # zstd level (the real dumps are -19 --long=31)
+
+TERMS = ["national debt", "national deficit"]
+WORDS = ("the of and to in is that it for on was with as be this by are rates "
+         "inflation market fed bond yield tax budget spending growth jobs wage "
+         "price housing rent bank loan credit policy congress senate bill vote "
+         "economy recession stock trade tariff oil energy dollar euro china "
+         "café naïve déjà vu — “quoted” ’").split()
+SUBREDDITS = ["Economics", "politics", "finance", "news", "AskEconomics"]
+FILLER = {
+    "all_awardings": [], "awarders": [], "gilded": 0, "locked": False,
+    "stickied": False, "no_follow": True, "send_replies": True,
+    "author_flair_text": None, "author_flair_css_class": None,
+    "treatment_tags": [], "retrieved_on": 0, "edited": False,
+}
+
+
+def id36(n):
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    out = ""
+    while True:
+        n, r = divmod(n, 36)
+        out = digits[r] + out
+        if not n:
+            return out
+
+
+class Generator:
+    def __init__(self, seed=SEED, match_rate=MATCH_RATE, near_miss=NEAR_MISS,
+                 malformed=MALFORMED, long_rate=LONG_RATE, long_chars=LONG_CHARS):
+        self.rng = random.Random(seed)
+        self.match_rate, self.near_miss = match_rate, near_miss
+        self.malformed, self.long_rate, self.long_chars = malformed, long_rate, long_chars
+        self.t = 1_200_000_000       # created_utc, advancing like a real dump
+
+    def words(self, n):
+        return " ".join(self.rng.choices(WORDS, k=n))
+
+    def text(self, n_words, force_match=False):
+        r = self.rng.random()
+        if self.rng.random() < self.long_rate:
+            s = self.words(self.long_chars // 6)[:self.long_chars]
+        else:
+            s = self.words(n_words)
+        if force_match or r < self.match_rate:
+            at = self.rng.randrange(len(s) + 1)
+            s = f"{s[:at]} {self.rng.choice(TERMS).title() if self.rng.random() < .3 else self.rng.choice(TERMS)} {s[at:]}"
+        elif r < self.match_rate + self.near_miss:
+            s = f"national {s} debt"
+        return s
+
+    def common(self, n):
+        self.t += self.rng.randrange(0, 40)
+        return {"id": id36(n), "created_utc": self.t,
+                "subreddit": self.rng.choice(SUBREDDITS),
+                "author": f"user_{self.rng.randrange(10**6)}",
+                "score": self.rng.randrange(-20, 500), **FILLER}
+
+    def submission(self, n, force_match=False):
+        obj = self.common(n)
+        title = self.text(12, force_match)
+        obj.update(title=title, selftext=self.text(60) if self.rng.random() < .5 else "",
+                   num_comments=self.rng.randrange(300),
+                   permalink=f"/r/{obj['subreddit']}/comments/{obj['id']}/x/",
+                   url=f"https://example.com/{obj['id']}")
+        return obj
+
+    def comment(self, n, link_id):
+        obj = self.common(n)
+        obj.update(body=self.text(40), link_id=f"t3_{link_id}", parent_id=f"t3_{link_id}",
+                   permalink=f"/r/{obj['subreddit']}/comments/{link_id}/x/{obj['id']}/")
+        return obj
+
+    def line(self, obj):
+        s = json.dumps(obj)
+        if self.rng.random() < self.malformed:
+            s = s[:self.rng.randrange(1, len(s))]
+        return (s + "\n").encode()
+
+
+# ── WRITING DUMPS ────────────────────────────────────────────────────────
+def write_dump(path, records, size_mb, level=LEVEL):
+    # compress lines from `records` (a callable i -> bytes) until size_mb of
+    # NDJSON is written; returns (lines, decompressed bytes)
+    limit, lines, written = int(size_mb * 2**20), 0, 0
+    cctx = zstd.ZstdCompressor(level=level)
+    with open(path, "wb") as f, cctx.stream_writer(f) as out:
+        while written < limit:
+            line = records(lines)
+            out.write(line)
+            lines += 1
+            written += len(line)
+    return lines, written
+
+
+def make_dumps(out_dir, size_mb=SIZE_MB, seed=SEED, comment_share=COMMENT_SHARE,
+               thread_match=THREAD_MATCH, level=LEVEL, **knobs):
+    # mixed.zst for scrape.py, submissions.zst + comments.zst for scrape2.py.
+    # Returns {name: {"path", "lines", "bytes", "compressed"}}
+    os.makedirs(out_dir, exist_ok=True)
+    info = {}
+
+    def done(name, path, counts):
+        info[name] = {"path": path, "lines": counts[0], "bytes": counts[1],
+                      "compressed": os.path.getsize(path)}
+
+    g = Generator(seed, **knobs)
+    path = os.path.join(out_dir, "mixed.zst")
+    done("mixed", path, write_dump(path, lambda i: g.line(
+        g.comment(i, id36(g.rng.randrange(36**6))) if g.rng.random() < comment_share
+        else g.submission(i)), size_mb, level))
+
+    # submissions first, remembering which ones match so comments can point
+    # at them; submissions get a share of size_mb in proportion to the mix
+    g = Generator(seed + 1, **knobs)
+    matching, others = [], []
+
+    def submission(i):
+        obj = g.submission(i)
+        haystack = f"{obj['title']} {obj['selftext']}".lower()
+        (matching if any(t in haystack for t in TERMS) else others).append(obj["id"])
+        return g.line(obj)
+
+    path = os.path.join(out_dir, "submissions.zst")
+    done("submissions", path, write_dump(path, submission,
+                                         max(size_mb * (1 - comment_share), 1), level))
+
+    def comment(i):
+        pool = matching if matching and g.rng.random() < thread_match else others
+        return g.line(g.comment(10**9 + i, g.rng.choice(pool)))
+
+    path = os.path.join(out_dir, "comments.zst")
+    done("comments", path, write_dump(path, comment, size_mb, level))
+    return info
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Write synthetic Pushshift-style .zst dumps.")
+    ap.add_argument("out_dir")
+    ap.add_argument("--size-mb", type=float, default=SIZE_MB, help="decompressed MB per dump")
+    ap.add_argument("--match-rate", type=float, default=MATCH_RATE)
+    ap.add_argument("--near-miss", type=float, default=NEAR_MISS)
+    ap.add_argument("--comment-share", type=float, default=COMMENT_SHARE)
+    ap.add_argument("--malformed", type=float, default=MALFORMED)
+    ap.add_argument("--long-rate", type=float, default=LONG_RATE)
+    ap.add_argument("--seed", type=int, default=SEED)
+    args = ap.parse_args()
+    info = make_dumps(args.out_dir, args.size_mb, args.seed, args.comment_share,
+                      match_rate=args.match_rate, near_miss=args.near_miss,
+                      malformed=args.malformed, long_rate=args.long_rate)
+    for name, d in info.items():
+        print(f"{d['path']}: {d['lines']:,} lines, {d['bytes'] / 2**20:.1f} MB "
+              f"({d['compressed'] / 2**20:.1f} MB compressed)")
@@ -0,0 +1,65 @@
+import os
+import sys
+from collections import Counter
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from dumpscan import ResumableScan, map_chunks, split_lines   # noqa: E402
+from synth_dump import write_dump                              # noqa: E402
+
+CHUNK_BYTES = 2048
+WORKERS     = 3
+
+
+class Crash(Exception):
+    pass
+
+
+def passthrough(chunk):
+    lines = split_lines(chunk)
+    return lines, Counter(lines=len(lines))
+
+
+def make_dumps(folder, n=3):
+    paths = []
+    for d in range(n):
+        path = str(folder / f"dump{d}.zst")
+        write_dump(path, lambda i, d=d: f'{{"dump": {d}, "n": {i}, "pad": "{"x" * (i % 50)}"}}\n'.encode(),
+                   size_mb=0.02)
+        paths.append(path)
+    return paths
+
+
+def scan(paths, output, resume=False, crash_after=None):
+    # every chunk written checkpoints (every=0); crash_after=k raises while
+    # writing the k-th chunk result, after k - 1 were written
+    s = ResumableScan(paths, output, resume, every=0, progress=0)
+    written = [0]
+
+    with s.open(encoding="utf-8", newline="") as outf:
+        def write(lines):
+            written[0] += 1
+            if written[0] == crash_after:
+                raise Crash
+            outf.write("".join(line.decode() + "\n" for line in lines))
+
+        s.write_all(outf, map_chunks(passthrough, s.chunks(CHUNK_BYTES), WORKERS), write)
+
+
+def test_parallel_resume_over_several_inputs(tmp_path):
+    paths = make_dumps(tmp_path)
+    clean = tmp_path / "clean.txt"
+    scan(paths, str(clean))
+    expected = clean.read_text()
+    n_chunks = sum(1 for _ in map_chunks(passthrough, ResumableScan(
+        paths, str(tmp_path / "count.txt")).chunks(CHUNK_BYTES)))
+    assert n_chunks > 3 * len(paths)            # several chunks per input
+
+    for crash_after in range(1, n_chunks + 1):
+        out = tmp_path / f"crash{crash_after}.txt"
+        with pytest.raises(Crash):
+            scan(paths, str(out), crash_after=crash_after)
+        scan(paths, str(out), resume=True)
+        assert out.read_text() == expected, f"crash after {crash_after - 1} chunks"
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+import io
+import os
+import csv
+import sqlite3
+
+import pandas as pd
+
+
+# Per-thread index of a scrape2.py comments CSV, built while the comments
+# are written: for every link_id the comment count, score sum, first and
+# last created_utc, and the byte offset of each of its rows in the CSV. A
+# thread's aggregates are one primary-key lookup, its comments a seek per
+# row, instead of a pass over the whole file plus a join.
+#
+# Lives next to the output as <output>.threads.sqlite. Like MonthlyCube it
+# is an `aggregate` of ResumableScan: committed with every checkpoint
+# together with the output position it matches, and brought back in line
+# when the output is reopened (rows past a shorter output are dropped; an
+# index that is missing or behind is rebuilt from the CSV).
+# Parquet outputs have no byte offsets and don't need this: filter the
+# link_id column instead.
+# ── CONFIG ───────────────────────────────────────────────────────────────
+COLUMNS = ("link_id", "created_utc", "score")   # what the index reads of a row
+
+
+def _int(v):
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return 0
+
+
+class CsvRows:
+    # csv.writer that also reports each row's byte offset: rows are
+    # formatted one by one into a buffer, then written in one go
+    def __init__(self, outf, position, encoding="utf-8", **fmt):
+        self.outf, self.position, self.encoding = outf, position, encoding
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer, **fmt)
+
+    def writerow(self, row):
+        self.writerows([row])
+
+    def writerows(self, rows):
+        # -> byte offsets of `rows` in the file
+        offsets, lines = [], []
+        for row in rows:
+            self.buffer.seek(0)
+            self.buffer.truncate()
+            self.writer.writerow(row)
+            line = self.buffer.getvalue()
+            offsets.append(self.position)
+            lines.append(line)
+            self.position += len(line.encode(self.encoding))
+        self.outf.write("".join(lines))
+        return offsets
+
+
+def csv_records(f, start=0, stop=None):
+    # (byte offset, raw record) of every CSV record from `start` on, for a
+    # file opened in binary; a record ends at a newline outside quotes
+    f.seek(start)
+    offset, parts = start, []
+    for line in f:
+        parts.append(line)
+        if sum(p.count(b'"') for p in parts) % 2:
+            continue                           # newline inside a quoted field
+        record = b"".join(parts)
+        if stop is not None and offset >= stop:
+            return
+        yield offset, record
+        offset += len(record)
+        parts = []
+
+
+def parse_record(record, encoding="utf-8"):
+    return next(csv.reader(io.StringIO(record.decode(encoding), newline="")))
+
+
+class ThreadIndex:
+    def __init__(self, output, columns, path=None):
+        # columns: the row layout add_rows() gets (scrape2's CMT_HEADER)
+        self.output  = str(output)
+        self.columns = list(columns)
+        self.idx     = [self.columns.index(c) for c in COLUMNS]
+        self.db      = sqlite3.connect(path or f"{output}.threads.sqlite")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS rows (
+                offset INTEGER PRIMARY KEY, link_id TEXT, created TEXT, score INTEGER);
+            CREATE INDEX IF NOT EXISTS rows_by_thread ON rows (link_id, offset);
+            CREATE TABLE IF NOT EXISTS threads (
+                link_id TEXT PRIMARY KEY, n INTEGER, score_sum INTEGER,
+                first_utc TEXT, last_utc TEXT) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER);
+        """)
+        self.pending = []
+
+    # ── adding rows ──────────────────────────────────────────────────────
+    def add_rows(self, rows, offsets):
+        # rows in `columns` order, offsets as returned by CsvRows.writerows
+        li, ci, si = self.idx
+        self.pending.extend((off, row[li], str(row[ci]), _int(row[si]))
+                            for off, row in zip(offsets, rows))
+
+    def commit(self, position):
+        # fold in everything added since the last commit; the index now
+        # matches the output up to `position`
+        self.db.executemany("INSERT OR REPLACE INTO rows VALUES (?, ?, ?, ?)", self.pending)
+        self.db.executemany(
+            """INSERT INTO threads VALUES (?, 1, ?, ?, ?)
+               ON CONFLICT(link_id) DO UPDATE SET n = n + 1, score_sum = score_sum + excluded.score_sum,
+                   first_utc = min(first_utc, excluded.first_utc),
+                   last_utc  = max(last_utc, excluded.last_utc)""",
+            [(link, score, created, created) for _, link, created, score in self.pending])
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES ('position', ?)", (position,))
+        self.db.commit()
+        self.pending.clear()
+
+    @property
+    def position(self):
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'position'").fetchone()
+        return None if row is None else row[0]
+
+    # ── keeping it in line with the output ───────────────────────────────
+    def reset(self):
+        self.pending.clear()
+        self.db.executescript("DELETE FROM rows; DELETE FROM threads; DELETE FROM meta;")
+        self.db.commit()
+
+    def sync(self, position):
+        # called once the output has been cut back to `position`
+        if position == 0:
+            self.reset()
+        elif self.position is not None and self.position > position:
+            # committed ahead of the checkpoint: drop the rows cut off
+            self.db.execute("DELETE FROM rows WHERE offset >= ?", (position,))
+            self._retotal()
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('position', ?)", (position,))
+            self.db.commit()
+        elif self.position != position:
+            self.rebuild(position)
+
+    def _retotal(self):
+        self.db.executescript("""
+            DELETE FROM threads;
+            INSERT INTO threads SELECT link_id, count(*), sum(score), min(created), max(created)
+                                FROM rows GROUP BY link_id;
+        """)
+
+    def rebuild(self, position=None):
+        # re-read the CSV (up to `position` bytes) and index it from scratch
+        self.reset()
+        with open(self.output, "rb") as f:
+            header = parse_record(f.readline())
+            if "link_id" not in header:
+                raise RuntimeError(f"{self.output} has no link_id column (written before the "
+                                   f"thread index existed); rerun scrape2.py without --resume")
+            li, ci, si = (header.index(c) for c in COLUMNS)
+            batch = []
+            for offset, record in csv_records(f, f.tell(), position):
+                row = parse_record(record)
+                batch.append((offset, row[li], row[ci], _int(row[si])))
+            self.db.executemany("INSERT INTO rows VALUES (?, ?, ?, ?)", batch)
+        self._retotal()
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES ('position', ?)",
+                        (position if position is not None else os.path.getsize(self.output),))
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    # ── reading ──────────────────────────────────────────────────────────
+    def thread(self, link_id):
+        # {"n", "score_sum", "first_utc", "last_utc"} of one thread, or None
+        row = self.db.execute("SELECT n, score_sum, first_utc, last_utc FROM threads WHERE link_id = ?",
+                              (link_id,)).fetchone()
+        return None if row is None else dict(zip(["n", "score_sum", "first_utc", "last_utc"], row))
+
+    def threads(self):
+        # every thread's aggregates, largest first
+        return pd.read_sql_query("SELECT * FROM threads ORDER BY n DESC", self.db, index_col="link_id")
+
+    def offsets(self, link_id):
+        return [o for (o,) in self.db.execute(
+            "SELECT offset FROM rows WHERE link_id = ? ORDER BY offset", (link_id,))]
+
+    def comments(self, link_id):
+        # one thread's rows, read straight from their offsets in the CSV
+        rows = []
+        with open(self.output, "rb") as f:
+            header = parse_record(f.readline())
+            for offset in self.offsets(link_id):
+                _, record = next(csv_records(f, offset))
+                rows.append(parse_record(record))
+        return pd.DataFrame(rows, columns=header)
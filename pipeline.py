@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# One entry point for the whole chain: dumps -> scrape/scrape2 -> sentiment
+# -> figures, and Google Trends/FRED -> Debt-Worry index figures. Every stage
+# lists the files it reads and writes; a stage depends on whichever stages
+# write its inputs. A stage re-runs only if the content hash of an input
+# changed since its last successful run, or one of its outputs is gone or
+# was changed by hand. Independent stages (e.g. the per-subreddit comment
+# scans) run concurrently. Content hashes are memoised by (size, mtime), so
+# the multi-GB dumps are only read again when they actually change.
+#
+# Per-stage wall time and peak RSS are kept in STATE_DIR/state.json and
+# appended to STATE_DIR/runs.jsonl. The peak is the largest single process
+# of the stage (its worker pools included), not their sum.
+# ── CONFIG ─────────────────────────────────────────────────────────
+ROOT      = Path(__file__).resolve().parent
+STATE_DIR = ROOT / ".pipeline"
+JOBS      = 2      # stages running at once
+RS, IX    = "Reddit_Sentiment", "Index"
+
+SCAN_CODE = [f"{RS}/dumpscan.py", f"{RS}/prefilter.py", f"{RS}/corpus.py", f"{RS}/monthly_cube.py"]
+SENT_CODE = [f"{RS}/Sentiment_Analysis.py", f"{RS}/sentiment_model.py", f"{RS}/score_cache.py",
+             f"{RS}/corpus.py", f"{RS}/monthly_cube.py"]
+TRENDS    = [f"{IX}/GoogleTrendsData/*.csv", f"{IX}/trends.py"]
+RENDER    = ["render_figures.py"]     # the figure stages run through it
+
+# name: dict(cwd, cmd (script + args, run with this Python), inputs, outputs).
+# Paths are relative to ROOT; inputs may be globs. The raw .zst dumps aren't
+# in the repo: a stage whose own source files are missing keeps the outputs
+# that are already there, or is skipped (with what depends on it) if there
+# are none. Neither counts as a failure.
+STAGES = {
+    "scrape_posts": dict(
+        cwd=RS, cmd=["scrape.py", "--input", "Economics_submissions.zst",
+                     "--output", "RawRedditCount/Economics_debt_deficit_posts.csv"],
+        inputs=[f"{RS}/Economics_submissions.zst", f"{RS}/scrape.py", *SCAN_CODE],
+        outputs=[f"{RS}/RawRedditCount/Economics_debt_deficit_posts.csv"]),
+    "scrape_comments": dict(
+        cwd=RS, cmd=["scrape.py", "--input", "Economics_comments.zst",
+                     "--output", "RawRedditCount/Economics_debt_deficit_comments.csv"],
+        inputs=[f"{RS}/Economics_comments.zst", f"{RS}/scrape.py", *SCAN_CODE],
+        outputs=[f"{RS}/RawRedditCount/Economics_debt_deficit_comments.csv"]),
+    "threads_economics": dict(
+        cwd=RS, cmd=["scrape2.py", "economics"],
+        inputs=[f"{RS}/Economics_submissions.zst", f"{RS}/Economics_comments.zst",
+                f"{RS}/scrape2.py", f"{RS}/idset.py", *SCAN_CODE],
+        outputs=[f"{RS}/economics_submission_ids.txt", f"{RS}/filtered_economics_comments.csv"]),
+    "threads_politics": dict(
+        cwd=RS, cmd=["scrape2.py", "politics"],
+        inputs=[f"{RS}/politics_submissions.zst", f"{RS}/politics_comments.zst",
+                f"{RS}/scrape2.py", f"{RS}/idset.py", *SCAN_CODE],
+        outputs=[f"{RS}/politics_submission_ids.txt", f"{RS}/filtered_politics_comments.csv"]),
+    # duplicate posts are grouped first and scored once per group
+    "dedup_posts": dict(
+        cwd=RS, cmd=["dedup.py", "RawRedditCount/Economics_debt_deficit_posts.csv"],
+        inputs=[f"{RS}/RawRedditCount/Economics_debt_deficit_posts.csv", f"{RS}/dedup.py",
+                f"{RS}/corpus.py", f"{RS}/monthly_cube.py"],
+        outputs=[f"{RS}/RawRedditCount/Economics_debt_deficit_posts_dedup.csv",
+                 f"{RS}/RawRedditCount/Economics_debt_deficit_posts_groups.csv"]),
+    "sentiment_posts": dict(
+        cwd=RS, cmd=["Sentiment_Analysis.py",
+                     "--input", "RawRedditCount/Economics_debt_deficit_posts_dedup.csv",
+                     "--output", "SentimentData/submission_economics_sentiment.csv"],
+        inputs=[f"{RS}/RawRedditCount/Economics_debt_deficit_posts_dedup.csv", *SENT_CODE],
+        outputs=[f"{RS}/SentimentData/submission_economics_sentiment.csv"]),
+    "sentiment_comments": dict(
+        cwd=RS, cmd=["Sentiment_Analysis.py",
+                     "--input", "RawRedditCount/Economics_debt_deficit_comments.csv",
+                     "--output", "SentimentData/comment_economics_sentiment.csv"],
+        inputs=[f"{RS}/RawRedditCount/Economics_debt_deficit_comments.csv", *SENT_CODE],
+        outputs=[f"{RS}/SentimentData/comment_economics_sentiment.csv"]),
+    # figures go through the headless renderer (figures/, PNG + SVG)
+    "plot_volume": dict(
+        cwd=".", cmd=["render_figures.py", "reddit_volume", "--workers", "1"],
+        inputs=[f"{RS}/RawRedditCount/Economics_debt_deficit_posts.csv",
+                f"{RS}/RawRedditCount/Economics_debt_deficit_posts_groups.csv",
+                f"{RS}/plot csv data_volume.py", f"{RS}/monthly_cube.py", *RENDER],
+        outputs=[]),
+    "plot_sentiment": dict(
+        cwd=".", cmd=["render_figures.py", "reddit_sentiment", "--workers", "1"],
+        inputs=[f"{RS}/SentimentData/comment_economics_sentiment.csv",
+                f"{RS}/plot sentiment data.py", f"{RS}/monthly_cube.py", *RENDER],
+        outputs=[]),
+    "plot_trends": dict(
+        cwd=".", cmd=["render_figures.py", "trends", "--workers", "1"],
+        inputs=[*TRENDS, f"{IX}/graph.py", *RENDER],
+        outputs=[]),
+    # FRED data is pulled by indexregressed.py itself, through Index/FredData
+    "debt_worry": dict(
+        cwd=".", cmd=["render_figures.py", "debt_worry", "debt_worry_backtest", "--workers", "2"],
+        inputs=[*TRENDS, f"{IX}/indexregressed.py", f"{IX}/fred_store.py",
+                f"{IX}/backtest.py", f"{IX}/resample.py", *RENDER],
+        outputs=[]),
+}
+
+
+# ── 1) CONTENT HASHES ────────────────────────────────────────────────
+def expand(patterns):
+    # globs -> sorted relative paths; a pattern matching nothing stays as is
+    files = set()
+    for pattern in patterns:
+        matches = [os.path.relpath(p, ROOT) for p in ROOT.glob(pattern)] if any(c in pattern for c in "*?[") else []
+        files.update(matches or [pattern])
+    return sorted(files)
+
+
+def content_hash(rel, memo):
+    # blake2b of the file, reused while its size and mtime stay the same;
+    # None for a missing file
+    try:
+        st = os.stat(ROOT / rel)
+    except FileNotFoundError:
+        return None
+    key = f"{st.st_size}:{st.st_mtime_ns}"
+    if memo.get(rel, {}).get("key") == key:
+        return memo[rel]["hash"]
+    h = hashlib.blake2b(digest_size=16)
+    with open(ROOT / rel, "rb") as f:
+        while block := f.read(1 << 20):
+            h.update(block)
+    memo[rel] = {"key": key, "hash": h.hexdigest()}
+    return memo[rel]["hash"]
+
+
+def hashes(patterns, memo):
+    return {rel: content_hash(rel, memo) for rel in expand(patterns)}
+
+
+# ── 2) THE STAGE GRAPH ───────────────────────────────────────────────
+def upstream(stages=STAGES):
+    # stage -> stages writing one of its inputs
+    writers = {out: name for name, st in stages.items() for out in st["outputs"]}
+    return {name: sorted({writers[i] for i in expand(st["inputs"]) if i in writers} - {name})
+            for name, st in stages.items()}
+
+
+def with_upstream(selected, deps):
+    todo, seen = list(selected), set()
+    while todo:
+        name = todo.pop()
+        if name not in seen:
+            seen.add(name)
+            todo.extend(deps[name])
+    return seen
+
+
+def why_stale(name, state, memo):
+    # None if the stage is up to date, else the reason it has to run
+    st, last = STAGES[name], state["stages"].get(name)
+    if last is None or last["status"] != "ok":
+        return "never ran" if last is None else "last run failed"
+    now = hashes(st["inputs"], memo)
+    changed = [rel for rel in now.keys() | last["inputs"].keys() if now.get(rel) != last["inputs"].get(rel)]
+    if changed:
+        return f"changed: {', '.join(sorted(changed)[:3])}{' ...' if len(changed) > 3 else ''}"
+    outputs = hashes(st["outputs"], memo)
+    if any(h is None for h in outputs.values()):
+        return "output missing"
+    if outputs != last["outputs"]:
+        return "output modified"
+    return None
+
+
+def missing_sources(name, memo, deps):
+    # inputs nothing in the pipeline writes and that aren't on disk
+    written = {out for up in deps[name] for out in STAGES[up]["outputs"]}
+    return [rel for rel, h in hashes(STAGES[name]["inputs"], memo).items()
+            if h is None and rel not in written]
+
+
+# ── 3) RUN ONE STAGE ─────────────────────────────────────────────────
+def run_stage(name):
+    st  = STAGES[name]
+    log = STATE_DIR / f"{name}.log"
+    t0  = time.perf_counter()
+    with open(log, "w") as out:
+        proc = subprocess.Popen([sys.executable, *st["cmd"]], cwd=ROOT / st["cwd"],
+                                stdout=out, stderr=subprocess.STDOUT)
+        # wait4 also gives the peak RSS (KiB on Linux) of the child and of
+        # every process it reaped, i.e. its worker pools
+        _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return {"returncode": proc.returncode, "wall_s": round(time.perf_counter() - t0, 3),
+            "peak_rss_mb": round(usage.ru_maxrss / 1024, 1), "log": os.path.relpath(log, ROOT)}
+
+
+# ── 4) SCHEDULER ─────────────────────────────────────────────────────
+def load_state():
+    path = STATE_DIR / "state.json"
+    state = json.loads(path.read_text()) if path.exists() else {}
+    return {"stages": state.get("stages", {}), "hashes": state.get("hashes", {})}
+
+
+def save_state(state):
+    tmp = STATE_DIR / "state.json.tmp"
+    tmp.write_text(json.dumps(state, indent=1))
+    os.replace(tmp, STATE_DIR / "state.json")
+
+
+def run_pipeline(selected=None, jobs=JOBS, force=False, dry_run=False):
+    STATE_DIR.mkdir(exist_ok=True)
+    state = load_state()
+    memo  = state["hashes"]
+    deps  = upstream()
+    names = with_upstream(selected or STAGES, deps)
+    pending = [n for n in STAGES if n in names]        # config order breaks ties
+    done, report, started = {}, [], time.strftime("%Y-%m-%dT%H:%M:%S")
+
+    def finish(name, status, reason, result=None):
+        done[name] = status
+        report.append({"stage": name, "status": status, "reason": reason, **(result or {})})
+        line = f"  {name:<20} {status:<8} {reason}"
+        if result:
+            line += f"  [{result['wall_s']:.1f}s, peak {result['peak_rss_mb']:.0f} MB]"
+        print(line, flush=True)
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        running = {}
+        while pending or running:
+            for name in list(pending):
+                if len(running) >= jobs:
+                    break
+                if any(d in pending or d in running.values() for d in deps[name] if d in names):
+                    continue
+                pending.remove(name)
+                if any(done.get(d) in ("failed", "blocked") for d in deps[name]):
+                    finish(name, "blocked", "an upstream stage failed")
+                    continue
+                if any(done.get(d) == "skipped" for d in deps[name]):
+                    finish(name, "skipped", "an upstream stage was skipped")
+                    continue
+                reason = "forced" if force else why_stale(name, state, memo)
+                if reason is None:
+                    finish(name, "current", "")
+                    continue
+                absent = missing_sources(name, memo, deps)
+                if absent:
+                    if all(h is not None for h in hashes(STAGES[name]["outputs"], memo).values()) \
+                            and STAGES[name]["outputs"]:
+                        finish(name, "kept", f"no {absent[0]}, keeping existing outputs")
+                    else:
+                        finish(name, "skipped", f"no {', '.join(absent)}")
+                    continue
+                if dry_run:
+                    finish(name, "would", reason)
+                    continue
+                print(f"  {name:<20} running  {reason}", flush=True)
+                # inputs are hashed when the stage starts: edits made while
+                # it runs make it stale again next time
+                inputs = hashes(STAGES[name]["inputs"], memo)
+                running[pool.submit(run_stage, name)] = name
+                state["stages"][name] = {"status": "running", "inputs": inputs, "outputs": {}}
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name   = running.pop(future)
+                result = future.result()
+                entry  = state["stages"][name]
+                ok     = result["returncode"] == 0
+                entry.update(status="ok" if ok else "failed", finished=time.strftime("%Y-%m-%dT%H:%M:%S"),
+                             outputs=hashes(STAGES[name]["outputs"], memo) if ok else {}, **result)
+                finish(name, "ok" if ok else "failed",
+                       "" if ok else f"exit {result['returncode']}, see {result['log']}", result)
+                save_state(state)
+
+    if not dry_run:
+        save_state(state)
+        with open(STATE_DIR / "runs.jsonl", "a") as f:
+            f.write(json.dumps({"started": started, "stages": report}) + "\n")
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Run the stages whose inputs changed, in dependency order.")
+    ap.add_argument("stages", nargs="*", metavar="STAGE",
+                    help="only these stages and what they depend on (default: all)")
+    ap.add_argument("--jobs", "-j", type=int, default=JOBS, help="stages running at once")
+    ap.add_argument("--force", action="store_true", help="run the selected stages even if current")
+    ap.add_argument("--dry-run", "-n", action="store_true", help="only say what would run and why")
+    ap.add_argument("--list", action="store_true", help="show the stages and their dependencies")
+    args = ap.parse_args()
+
+    unknown = set(args.stages) - set(STAGES)
+    if unknown:
+        ap.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+    if args.list:
+        for name, up in upstream().items():
+            print(f"{name:<20} <- {', '.join(up) or '(sources only)'}")
+        sys.exit(0)
+
+    report = run_pipeline(args.stages, args.jobs, args.force, args.dry_run)
+    sys.exit(1 if any(r["status"] == "failed" for r in report) else 0)
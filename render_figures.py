@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+import os
+import re
+import sys
+import json
+import glob
+import time
+import runpy
+import hashlib
+import argparse
+import tempfile
+import traceback
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from pipeline import content_hash
+
+# Headless batch rendering of every figure the plot scripts draw. Each job
+# runs one script unchanged in a child process of its own (a plain
+# subprocess, so a script can start worker pools of its own), on the Agg
+# backend, with plt.show() replaced by "save every open figure to OUT_DIR
+# and close it" (file names come from the figure titles). Jobs run in
+# parallel; a job whose script and input files have the same content hashes
+# as on its last successful render is skipped, so a nightly refresh only
+# redraws what changed. The hashes are memoised by (size, mtime) in
+# OUT_DIR/.hashes.json. Running a script directly still opens the windows.
+# ── CONFIG ─────────────────────────────────────────────────────────
+ROOT    = Path(__file__).resolve().parent
+OUT_DIR = ROOT / "figures"
+FORMATS = ["png", "svg"]
+DPI     = 150
+WORKERS = os.cpu_count() or 1
+
+# job name: (script, its command-line arguments, input files/globs); paths
+# are relative to ROOT, the script's own source is always an input
+JOBS = {
+    "trends": ("Index/graph.py", [], [
+        "Index/GoogleTrendsData/*.csv", "Index/trends.py",
+    ]),
+    "debt_worry": ("Index/indexregressed.py", [], [
+        "Index/GoogleTrendsData/*.csv", "Index/FredData/*",
+        "Index/trends.py", "Index/fred_store.py", "Index/resample.py",
+    ]),
+    "debt_worry_backtest": ("Index/indexregressed.py", ["--backtest"], [
+        "Index/GoogleTrendsData/*.csv", "Index/FredData/*",
+        "Index/trends.py", "Index/fred_store.py", "Index/backtest.py",
+    ]),
+    "reddit_volume": ("Reddit_Sentiment/plot csv data_volume.py", [], [
+        "Reddit_Sentiment/RawRedditCount/Economics_debt_deficit_posts.csv",
+        "Reddit_Sentiment/RawRedditCount/Economics_debt_deficit_posts_groups.csv",   # COUNT_GROUPS
+        "Reddit_Sentiment/monthly_cube.py",
+    ]),
+    "reddit_sentiment": ("Reddit_Sentiment/plot sentiment data.py", [], [
+        "Reddit_Sentiment/SentimentData/comment_economics_sentiment.csv",
+        "Reddit_Sentiment/monthly_cube.py",
+    ]),
+}
+
+
+# ── 1) WHAT A JOB DEPENDS ON ─────────────────────────────────────────
+def input_files(job):
+    script, _, patterns = JOBS[job]
+    files = {script}
+    for pattern in patterns:
+        matches = glob.glob(str(ROOT / pattern))
+        if not matches:
+            # a missing input is part of the fingerprint too (it shows up once created)
+            matches = [str(ROOT / pattern)]
+        files.update(os.path.relpath(m, ROOT) for m in matches)
+    return sorted(files)
+
+
+def fingerprint(job, formats, dpi, memo):
+    # memo: content hashes by (size, mtime), as pipeline.py keeps them
+    script, args, _ = JOBS[job]
+    h = hashlib.blake2b(f"{script}|{args}|{sorted(formats)}|{dpi}".encode(), digest_size=12)
+    for rel in input_files(job):
+        h.update(f"|{rel}:{content_hash(rel, memo) or 'missing'}".encode())
+    return h.hexdigest()
+
+
+# ── 2) RENDER ONE JOB (child process) ────────────────────────────────
+def slug(text):
+    return re.sub(r"[^a-z0-9]+", "_", text.lower())[:60].strip("_")
+
+
+def render(task):
+    job, out_dir, formats, dpi = task
+    import matplotlib
+    matplotlib.use("Agg", force=True)
+    import matplotlib.pyplot as plt
+
+    script, args, _ = JOBS[job]
+    path  = ROOT / script
+    saved = []
+
+    def save_open_figures(*_, **__):
+        for num in plt.get_fignums():
+            fig    = plt.figure(num)
+            titles = [ax.get_title() for ax in fig.axes if ax.get_title()]
+            name   = f"{job}-{slug(titles[0]) if titles else len(saved) + 1}"
+            while any(Path(s).stem == name for s in saved):
+                name += "_"
+            for fmt in formats:
+                target = Path(out_dir) / f"{name}.{fmt}"
+                fig.savefig(target, dpi=dpi)
+                saved.append(str(target))
+            plt.close(fig)
+
+    # the scripts read paths relative to their own folder and import siblings
+    t0 = time.perf_counter()
+    try:
+        os.chdir(path.parent)
+        sys.path.insert(0, str(path.parent))
+        sys.argv = [str(path), *args]
+        plt.show = save_open_figures
+        runpy.run_path(str(path), run_name="__main__")
+        save_open_figures()   # anything drawn after the last show()
+    except BaseException:
+        return job, None, traceback.format_exc(), time.perf_counter() - t0
+    return job, saved, None, time.perf_counter() - t0
+
+
+def run_job(task):
+    # render(task) in a fresh interpreter: clean pyplot state and imports
+    job = task[0]
+    t0  = time.perf_counter()
+    with tempfile.TemporaryDirectory() as tmp:
+        result = Path(tmp) / "result.json"
+        proc = subprocess.run(
+            [sys.executable, str(Path(__file__).resolve()), "--child", json.dumps([*task, str(result)])],
+            env={**os.environ, "MPLBACKEND": "Agg"})
+        if result.exists():
+            return tuple(json.loads(result.read_text()))
+    return job, None, f"exited with code {proc.returncode}", time.perf_counter() - t0
+
+
+# ── 3) ALL JOBS, SKIPPING UNCHANGED ONES ────────────────────────────
+def render_all(jobs=None, out_dir=OUT_DIR, formats=FORMATS, dpi=DPI,
+               workers=WORKERS, force=False):
+    out_dir = Path(out_dir).resolve()     # the jobs run in their scripts' folders
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stamps_path = out_dir / ".stamps.json"
+    stamps = json.loads(stamps_path.read_text()) if stamps_path.exists() else {}
+    memo_path = out_dir / ".hashes.json"
+    memo = json.loads(memo_path.read_text()) if memo_path.exists() else {}
+
+    todo, skipped = [], []
+    for job in jobs or list(JOBS):
+        stamp = stamps.get(job, {})
+        if (not force and stamp.get("fingerprint") == fingerprint(job, formats, dpi, memo)
+                and all(os.path.exists(f) for f in stamp.get("files", []))):
+            skipped.append(job)
+        else:
+            todo.append(job)
+    for job in skipped:
+        print(f"  {job}: unchanged, {len(stamps[job]['files'])} files kept")
+
+    tasks  = [(job, str(out_dir), formats, dpi) for job in todo]
+    failed = []
+    if not tasks:
+        return {"rendered": [], "skipped": skipped, "failed": failed}
+    with ThreadPoolExecutor(min(workers, len(tasks))) as pool:
+        for future in as_completed([pool.submit(run_job, task) for task in tasks]):
+            job, saved, error, seconds = future.result()
+            if error is not None:
+                failed.append(job)
+                print(f"  {job}: FAILED after {seconds:.1f}s\n{error}")
+                continue
+            print(f"  {job}: {len(saved)} files in {seconds:.1f}s")
+            stamps[job] = {"fingerprint": fingerprint(job, formats, dpi, memo), "files": saved}
+            # written after every job, so a later failure keeps earlier stamps
+            for path, data in ((stamps_path, stamps), (memo_path, memo)):
+                tmp = path.with_suffix(".tmp")
+                tmp.write_text(json.dumps(data, indent=1))
+                os.replace(tmp, path)
+    return {"rendered": [j for j in todo if j not in failed], "skipped": skipped, "failed": failed}
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        *task, result = json.loads(sys.argv[2])
+        out = render(tuple(task))
+        Path(result).write_text(json.dumps(out))
+        sys.exit(0)
+
+    ap = argparse.ArgumentParser(description="Render every figure headless to PNG/SVG files.")
+    ap.add_argument("jobs", nargs="*", metavar="JOB",
+                    help=f"only these jobs ({', '.join(JOBS)}); default all")
+    ap.add_argument("--out", default=OUT_DIR, help="output directory")
+    ap.add_argument("--formats", default=",".join(FORMATS), help="comma-separated, e.g. png,svg,pdf")
+    ap.add_argument("--dpi", type=int, default=DPI)
+    ap.add_argument("--workers", type=int, default=WORKERS)
+    ap.add_argument("--force", action="store_true", help="re-render even if nothing changed")
+    args = ap.parse_args()
+    unknown = set(args.jobs) - set(JOBS)
+    if unknown:
+        ap.error(f"unknown job(s): {', '.join(sorted(unknown))}")
+
+    summary = render_all(args.jobs, args.out, args.formats.split(","), args.dpi,
+                         args.workers, args.force)
+    print(f"{len(summary['rendered'])} rendered, {len(summary['skipped'])} unchanged, "
+          f"{len(summary['failed'])} failed")
+    sys.exit(1 if summary["failed"] else 0)